@@ -5,12 +5,56 @@ from methods import *
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import RedirectResponse
+from fastapi.responses import StreamingResponse
 from home_page import *
 from fastapi.responses import JSONResponse
 from fastapi import Form
+from contextlib import asynccontextmanager
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from serialization import *
+from valuation import *
+from risk import *
+from price_refresher import *
+from live_updates import *
+from route_policies import *
+from symbol_master import symbol_master
+from portfolios import *
+from position_snapshots import *
+
+
+def all_items() -> dict[tuple[str, int], StockEntry]:
+    """
+    Transactions de tous les portefeuilles réunies dans un même dictionnaire
+    :return: {(portefeuille, id): StockEntry}
+    """
+    return {(portfolio, item_id): item for portfolio, portfolio_items in portfolios.items()
+            for item_id, item in portfolio_items.items()}
+
+
+# rafraîchissement des prix des ISIN détenus (tous portefeuilles confondus) en tâche de fond
+price_refresher = PriceRefresher(all_items)
+
+# diffusion aux clients abonnés des modifications des positions
+live_broker = LiveUpdateBroker(lambda: portfolios, price_refresher)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Démarre le rafraîchissement des prix et la diffusion des mises-à-jour au lancement de l'API
+    et les arrête à sa fermeture
+    :param app:
+    :return:
+    """
+    price_refresher.start()
+    live_broker.start()
+    yield
+    await live_broker.stop()
+    await price_refresher.stop()
+    shutdown_executors()
 
 
-app = FastAPI(debug=True)
+app = FastAPI(debug=True, lifespan=lifespan)
 
 
 # Gestionnaires d'exceptions
@@ -18,28 +62,47 @@ app.add_exception_handler(StarletteHTTPException, http_exception_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
 # décorateur
-def register_route(path: str, method: Method):
+def register_route(path: str, method: Method, cache_ttl: float | None = None, timeout: float | None = None,
+                   max_concurrency: int | None = None, rate_limit: tuple[int, float] | None = None,
+                   batch: bool = False, batch_handler=None, executor: str | None = None):
     """
      #   création d'un décorateur fastAPI de gestion des Tests
      #   :param path: lien vers la route
      #   :param method: get / post / put / delete
+     #   :param cache_ttl: durée de mise en cache de la réponse en secondes (clé dérivée du chemin et des paramètres)
+     #   :param timeout: durée maximale d'exécution en secondes (504 au-delà)
+     #   :param max_concurrency: nombre maximal d'exécutions simultanées (503 au-delà)
+     #   :param rate_limit: (nombre de requêtes, fenêtre en secondes) autorisé par IP cliente (429 au-delà)
+     #   :param batch: enregistre aussi une route POST <path sans paramètres>/batch qui reçoit une liste de jeux d'arguments
+     #   :param batch_handler: implémentation vectorisée optionnelle de la route /batch (liste d'arguments -> liste de résultats)
+     #   :param executor: "loop" (boucle d'événements), "thread" (pool de threads dédié) ou "process" (pool de processus,
+     #   pour les calculs qui monopolisent le GIL) ; par défaut, le comportement de FastAPI
      #   :return: l'output de la fonction décorateur est la fonction associée à la route définie
 
      """
     def decorator(func):
+        # application des règles de performance et chronométrage de la route
+        endpoint = apply_route_policies(func, path, method, cache_ttl=cache_ttl, timeout=timeout,
+                                        max_concurrency=max_concurrency, rate_limit=rate_limit, executor=executor)
         match method.lower():
             case 'get':
-                app.get(path)(func)
+                app.get(path)(endpoint)
             case 'post':
-                app.post(path)(func)
+                app.post(path)(endpoint)
             case 'put':
-                app.put(path)(func)
+                app.put(path)(endpoint)
             case 'delete':
-                app.delete(path)(func)
+                app.delete(path)(endpoint)
             case 'patch':
-                app.patch(path)(func)
+                app.patch(path)(endpoint)
             case _:
                 raise HTTPException(status_code=404, detail="méthode non gérée")
+        if batch:
+            # variante par lot de la route, validée avec la même signature
+            batch_endpoint = apply_route_policies(build_batch_endpoint(func, batch_handler, executor=executor),
+                                                  get_batch_path(path), "post",
+                                                  timeout=timeout, max_concurrency=max_concurrency, rate_limit=rate_limit)
+            app.post(get_batch_path(path))(batch_endpoint)
         return func
     return decorator
 
@@ -48,49 +111,110 @@ def register_route(path: str, method: Method):
 # Create a Jinja2Templates instance and specify the "templates" directory
 templates = Jinja2Templates(directory="templates")
 
-# récupération en objet StockEntry des éléments du fichier csv
-items = get_item_dict()
+# Environnement Jinja2 asynchrone pour le rendu progressif (streaming) des templates
+stream_templates = Environment(loader=FileSystemLoader("templates"), autoescape=select_autoescape(), enable_async=True)
+
+# récupération en objets StockEntry des transactions de chaque portefeuille (une partition csv par portefeuille)
+portfolios = load_all_portfolios()
+
+# transactions du portefeuille par défaut (fichier FILE_PATH)
+items = portfolios[DEFAULT_PORTFOLIO]
+
+
+def get_portfolio_items(portfolio: str, create: bool = False) -> dict[int, StockEntry]:
+    """
+    Récupération des transactions d'un portefeuille
+    :param portfolio: nom du portefeuille
+    :param create: si le portefeuille n'existe pas encore, retourne un dictionnaire vide, qui n'est enregistré
+    dans portfolios qu'une fois sa partition csv écrite
+    :return: {id: StockEntry}
+    """
+    if not is_valid_portfolio_name(portfolio):
+        raise HTTPException(status_code=400, detail="nom de portefeuille invalide")
+    if portfolio not in portfolios:
+        if not create:
+            raise HTTPException(status_code=404, detail=f"portfolio {portfolio} does not exist")
+        return {}
+    return portfolios[portfolio]
+
 
 # définition d'une route en utilisant le décorateur
-@register_route("/", method="get")
-async def get_home_page(request: Request):
+@register_route("/", method="get", executor="thread")
+def get_home_page(request: Request, stream: bool = False, portfolio: str = DEFAULT_PORTFOLIO):
     """
     Calculer et mettre-à-jour les positions nettes
     et les plus ou moins values latentes et réalisées
     en fonction de l'inventaire des transactions
     :param request:
+    :param stream: si True, la page est envoyée progressivement : d'abord les totaux des transactions,
+    puis chaque position dès que son prix est disponible
+    :param portfolio: nom du portefeuille affiché
     :return:
     """
-    # récupération des lignes du csv en dict StockEntry
-    items = get_item_dict()
+    # transactions du portefeuille en dict StockEntry
+    items = get_portfolio_items(portfolio)
+
+    if stream:
+        return stream_home_page(request, items, portfolio)
 
-    # calcul des positions netttes à partir de l'inventaire des transactions items
-    items_net_positions = get_net_position(items)
+    # calcul des positions netttes à partir de l'inventaire des transactions items (prix lus dans l'instantané)
+    items_net_positions = get_net_position(items, price_refresher)
 
     # calcul des plus-values latentes
-    gains, latent_gains = calculate_portfolio_gains(items_net_positions)
+    gains, latent_gains = calculate_portfolio_gains(items_net_positions, portfolio)
 
     #affichage du résultat dans le template
     return templates.TemplateResponse("home.html", {
         "request": request,
         "items": items_net_positions,
         "gains": gains,
-        "latent_gains": latent_gains
+        "latent_gains": latent_gains,
+        "portfolio": portfolio
     })
 
 
+def stream_home_page(request: Request, items: dict[int, StockEntry], portfolio: str = DEFAULT_PORTFOLIO) -> StreamingResponse:
+    """
+    Rendu progressif de la page d'accueil : l'en-tête, les totaux des transactions et les plus-values réalisées
+    (qui ne dépendent pas des prix actuels) sont envoyés immédiatement, puis les lignes de positions
+    dans l'ordre d'obtention des prix
+    :param request:
+    :param items: inventaire des transactions
+    :param portfolio: nom du portefeuille
+    :return: StreamingResponse html
+    """
+    # plus-values réalisées et prix moyens d'achat, calculés à partir du seul fichier csv du portefeuille
+    gains, latent_gains = calculate_portfolio_gains({}, portfolio)
+    buys, sells = load_buy_and_sell_operations(portfolio)
+    average_buy_prices = get_average_buy_prices(buys)
+    totals = {"count": len(items), "bought": buys['total_price'].sum(), "sold": sells['total_price'].sum()}
+
+    async def positions():
+        # chaque position est accompagnée de sa plus ou moins-value latente
+        async for net_position in stream_net_positions(items, price_refresher):
+            yield net_position, calculate_latent_gain(net_position, average_buy_prices)
+
+    template = stream_templates.get_template("home_stream.html")
+    content = template.generate_async(request=request, totals=totals, gains=gains, positions=positions(),
+                                      portfolio=portfolio)
+    return StreamingResponse(content, media_type="text/html")
+
+
 # définition d'une route en utilisant le décorateur
 @register_route("/add-item", method="post")
-async def add_item(date: str = Form(...), isin: str = Form(...), company_name: str = Form(...), quantity: float = Form(...), operation_type: str = Form(...)):
+async def add_item(date: str = Form(...), isin: str = Form(...), company_name: str | None = Form(None), quantity: float = Form(...), operation_type: str = Form(...), portfolio: str = Form(DEFAULT_PORTFOLIO)):
     """
     Ajouter un élément à notre inventaire et l'ajouter à notre objet items: BaseModel ainsi qu'à un fichier .csv (qui fait figure de database lorsqu'on ferme l'API)
     :param date:
     :param isin:
-    :param company_name:
+    :param company_name: facultatif, lu dans le référentiel local des symboles (ou sur Yahoo Finance) s'il n'est pas renseigné
     :param quantity:
     :param operation_type:
+    :param portfolio: portefeuille de la transaction (créé s'il n'existe pas)
     :return: une fois l'élément ajouté, s'il n'y a pas d'erreurs on est regirrigé vers l'inventaire /read_stock_data
     """
+    # transactions du portefeuille concerné
+    items = get_portfolio_items(portfolio, create=True)
 
     # affectation d'un id au nouvel élément
     new_item_id = max(items.keys()) + 1 if items else 0
@@ -107,6 +231,14 @@ async def add_item(date: str = Form(...), isin: str = Form(...), company_name: s
     if not is_valid_yfinance_ticker(isin):
         raise HTTPException(status_code=400, detail="ticker invalide")
 
+    # vérification que le ticker existe (référentiel local, ou Yahoo Finance si le référentiel n'est pas exhaustif)
+    known_name = get_company_name(isin)
+    if not known_name:
+        raise HTTPException(status_code=400, detail=f"ticker {isin} inconnu")
+
+    # nom de l'entreprise lu dans le référentiel (ou sur Yahoo Finance) s'il n'est pas renseigné
+    company_name = company_name or known_name
+
     try:
         # Test de conversion de date en un objet datetime
         dateobj = datetime.strptime(date, "%Y-%m-%d")
@@ -120,13 +252,15 @@ async def add_item(date: str = Form(...), isin: str = Form(...), company_name: s
     unit_price = result['price']
 
     #création d'un nouvel élément new_item: StockEntry
-    new_item = StockEntry(index=new_item_id, date=date, isin=isin, company_name=company_name, quantity=quantity, unit_price=unit_price, total_price=unit_price*quantity, operation_type=op_type)
+    new_item = StockEntry(index=new_item_id, date=date, isin=isin, company_name=company_name, quantity=quantity, unit_price=unit_price, total_price=unit_price*quantity, operation_type=op_type, portfolio=portfolio)
 
-    # ajout de l'élément au dictionnaire
+    # ajout de l'élément au dictionnaire (les instantanés de positions postérieurs à sa date sont à reconstruire)
     items[new_item_id] = new_item
+    invalidate_position_snapshots(portfolio, date)
+    bump_store_version(portfolio)
 
-    # mise-à-jour des données dans le csv
-    update_dict = new_item.dict()
+    # mise-à-jour des données dans le csv (le portefeuille est donné par le fichier)
+    update_dict = new_item.dict(include=set(CSV_COLUMNS))
 
     # conversion de operation_type en string
     update_dict['operation_type'] = op_type
@@ -137,11 +271,19 @@ async def add_item(date: str = Form(...), isin: str = Form(...), company_name: s
     # conversion en df de la ligne créée
     new_item_df = pd.DataFrame([update_dict])
 
-    # ajout du nouvel élément au df contenant les données du csv
-    df = pd.concat([read_csv(FILE_PATH), new_item_df])
+    # ajout du nouvel élément au df contenant les données du csv de la partition (créée si besoin)
+    file_path = get_portfolio_file_path(portfolio)
+    if os.path.exists(file_path):
+        df = pd.concat([read_csv(file_path), new_item_df])
+    else:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        df = new_item_df
 
     # conversion en csv du nouveau df
-    df.to_csv(FILE_PATH, index=False)
+    df[CSV_COLUMNS].to_csv(file_path, index=False)
+
+    # un nouveau portefeuille n'est enregistré qu'une fois la transaction validée et sa partition écrite
+    portfolios.setdefault(portfolio, items)
 
     # JavaScript response pour redirriger vers la page d'accueil
     response_html = f"""
@@ -150,34 +292,55 @@ async def add_item(date: str = Form(...), isin: str = Form(...), company_name: s
     </script>
     """
 
-    # Après l'ajout, rediriger vers la page d'accueil
-    return RedirectResponse(url="/", status_code=303)
+    # Après l'ajout, rediriger vers la page d'accueil du portefeuille
+    url = "/" if portfolio == DEFAULT_PORTFOLIO else f"/?portfolio={portfolio}"
+    return RedirectResponse(url=url, status_code=303)
 
 
 
 # définition d'une route en utilisant le décorateur
 @register_route("/read_stock_data", method="get")
-async def read_stock_data_api() -> dict[str, dict[int, StockEntry]]:
+async def read_stock_data_api(portfolio: str = DEFAULT_PORTFOLIO) -> dict[str, dict[int, StockEntry]]:
     """
     récupération et affichage des données sur l'api
+    :param portfolio: nom du portefeuille
     :return:
     """
-    return {"items": items}
+    return RawJSONResponse({"items": encode_stock_entry_dict(get_portfolio_items(portfolio))})
+
+def query_items_by_ids(arguments: list[dict]) -> list:
+    """
+    Implémentation vectorisée de query_item_by_id pour la route /read_stock_data/items/batch
+    :param arguments: liste des arguments validés [{"item_id": int, "portfolio": str}, ...]
+    :return: liste des StockEntry (ou HTTPException 404 pour les id ou portefeuilles inexistants), dans l'ordre
+    """
+    results = []
+    for kwargs in arguments:
+        items = portfolios.get(kwargs["portfolio"])
+        if items is None:
+            results.append(HTTPException(status_code=404, detail=f"portfolio {kwargs['portfolio']} does not exist"))
+        elif kwargs["item_id"] not in items:
+            results.append(HTTPException(status_code=404, detail=f"item with {kwargs['item_id']} does not exist"))
+        else:
+            results.append(items[kwargs["item_id"]])
+    return results
 
 # définition d'une route en utilisant le décorateur
-@register_route("/read_stock_data/items/{item_id}", method="get")
-def query_item_by_id(item_id: int) -> StockEntry:
+@register_route("/read_stock_data/items/{item_id}", method="get", batch=True, batch_handler=query_items_by_ids)
+def query_item_by_id(item_id: int, portfolio: str = DEFAULT_PORTFOLIO) -> StockEntry:
     """
     Récupération sur l'API d'un élément en particulier en spécifiant son id
     cf: Tests/retrieve_stock_by_id.py
     :param item_id: int
+    :param portfolio: nom du portefeuille
     :return: {response : {item:StockEntry}}
     """
+    items = get_portfolio_items(portfolio)
     # gestion d'erreurs si l'id entré par l'utilisateur n'est pas valide
     if item_id not in items:
         raise HTTPException(status_code=404, detail=f"item with {item_id} does not exist")
-    # récupération de l'élément correspondant sous fore d'un message json
-    return JSONResponse(content=f"item {items[item_id]}")
+    # récupération de l'élément correspondant, sérialisé directement en bytes json
+    return RawJSONResponse(encode_stock_entry(items[item_id]))
 
 Selection = dict[str, str | int | float | OperationType | None]
 
@@ -188,7 +351,8 @@ def query_item_by_parameters(
     isin: str | None = None,
     unit_price: float | None = None,
     quantity: float | None = None,
-    operation_type: OperationType | None = None):
+    operation_type: OperationType | None = None,
+    portfolio: str = DEFAULT_PORTFOLIO):
     """
     Récupération sur l'API d'un ou plusieurs éléments à partir de l'isin / le type d'opération / le unit_price
     cf: Tests/retrieve_stock_by_id.py
@@ -196,26 +360,13 @@ def query_item_by_parameters(
     :param unit_price:
     :param quantity:
     :param operation_type:
+    :param portfolio: nom du portefeuille
     :return: {JSONResponse : {item:StockEntry}}
     """
-    # Initialisatoin d'une liste vide pour stocker les éléments sélectionnés en fonction des paramètres
-    selected_items = []
-
-    # itérations sur tous les éléments de items
-    for item in items.values():
-
-        # Vérifie si l'ISIN correspond au paramètre ou si le paramètre n'est pas spécifié
-        if isin is None or item.isin == isin:
-
-            # Convertit l'élément en dictionnaire
-            item_dict = item.dict()
+    items = get_portfolio_items(portfolio)
 
-            # Convertit le type d'opération en chaîne de caractères
-            if item.operation_type is not None:
-                item_dict["operation_type"] = item.operation_type.value
-
-            # Ajoute l'élément sélectionné à la liste
-            selected_items.append(item_dict)
+    # Sélection des éléments dont l'ISIN correspond au paramètre (ou tous si le paramètre n'est pas spécifié)
+    selected_items = [item for item in items.values() if isin is None or item.isin == isin]
 
     # Création d'un dictionnaire de réponse avec les résultats de la requête
     response_data = {
@@ -223,27 +374,31 @@ def query_item_by_parameters(
             "isin": isin,
             "unit_price": unit_price,
             "quantity": quantity,
-            "operation_type": operation_type.value if operation_type else None,
+            "operation_type": operation_type,
         },
-        "selection": selected_items,  # Ajoute les éléments sélectionnés dans la réponse
+        "selection": encode_stock_entries(selected_items),  # Ajoute les éléments sélectionnés dans la réponse
     }
 
-    return JSONResponse(content=response_data)
+    return RawJSONResponse(response_data)
 
 # Modifier la fonction update pour accepter le corps de la requête au format JSON
 # Définition de la route en utilisant le décorateur
 @register_route("/read_stock_data/update_stock_data/{item_id}", method="put")
-async def update_item(item_id: int, request: Request):
+async def update_item(item_id: int, request: Request, portfolio: str = DEFAULT_PORTFOLIO):
     """
     modifier un élément de l'inventaire dans l'API et enregistrer cette modification dans le fichier csv
     cf: Tests/test_query.py
     :param item_id:
     :param data: Les données JSON dans le corps de la requête
+    :param portfolio: nom du portefeuille
     :return: un message de succès après avoir modifié l'élément selon les informations renseignés
     """
     data = await request.json()
+    items = get_portfolio_items(portfolio)
 
     # Récupère l'élément spécifié par son ID
+    if item_id not in items:
+        raise HTTPException(status_code=404, detail=f"Item with {item_id=} does not exist.")
     item = items[item_id]
 
     # Vérifie si 'quantity' est présent dans les données JSON
@@ -252,45 +407,38 @@ async def update_item(item_id: int, request: Request):
         item.quantity = quantity  # Met à jour la quantité
 
         # Met à jour le prix unitaire en fonction de la date et de l'ISIN
+        previous_date = item.date
         result = get_unit_price(item.date, item.isin)
         item.unit_price = result["price"]
         item.date = result["date"]
 
-        # Met à jour l'élément dans le dictionnaire 'items'
+        # Met à jour l'élément dans le dictionnaire 'items' (instantanés de positions invalidés à partir de sa date)
         items[item_id] = item
-        index = item_id
-
-        # Conversion de operation_type en str
-        for item_id, item in items.items():
-            item.operation_type = item.operation_type.value
-
-        # Crée un DataFrame pandas à partir des éléments du stock
-        df = pd.DataFrame([item.dict() for item in items.values()])
-
-        # Retranscription dans le CSV de l'API après avoir modifié les données
-        df['total_price'] = df['quantity'] * df['unit_price']
-        column_order = ['date', 'isin', 'company_name', 'quantity', 'unit_price', 'total_price', 'operation_type']
-        df = df[column_order]
+        invalidate_position_snapshots(portfolio, previous_date, item.date)
+        bump_store_version(portfolio)
 
-        df.to_csv(FILE_PATH, index=False)  # Enregistre le DataFrame dans un fichier CSV
+        # Retranscription dans le CSV du portefeuille après avoir modifié les données
+        write_portfolio_csv(portfolio, items)
 
-        # Message de réponse
-        response_data = {"message": f"Item {items[index]} updated successfully"}
+        # Message de réponse, l'élément modifié étant sérialisé directement en octets
+        response_data = {"message": f"Item {item_id} updated successfully", "item": encode_stock_entry(item)}
     else:
         # Si 'quantity' n'est pas présent dans les données JSON, retournez une erreur
         raise HTTPException(status_code=400, detail="The 'quantity' field is required in the JSON data.")
 
-    return response_data
+    return RawJSONResponse(response_data)
 
 # définition d'une route en utilisant le décorateur
 @register_route("/read_stock_data/delete_stock_data/{item_id}", method="delete")
-def delete_item(item_id: int) -> ResponseModel:
+def delete_item(item_id: int, portfolio: str = DEFAULT_PORTFOLIO) -> ResponseModel:
     """
     supprimer un item après avoir spécifié l'id
     cf: Tests/delete_line.py
     :param item_id:
+    :param portfolio: nom du portefeuille
     :return:
     """
+    items = get_portfolio_items(portfolio)
     if item_id not in items:
         raise HTTPException(
             status_code=404, detail=f"Item with {item_id=} does not exist."
@@ -298,26 +446,142 @@ def delete_item(item_id: int) -> ResponseModel:
 
     #suppression de l'item dans l'API
     item = items.pop(item_id)
+    invalidate_position_snapshots(portfolio, item.date)
+    bump_store_version(portfolio)
 
-    for item_id, item in items.items():
-        # Conversion de operation_type en string
-        item.operation_type = item.operation_type.value
+    # Mise-à-jour du csv du portefeuille avec les changements
+    write_portfolio_csv(portfolio, items)
 
-    # Mise-à-jour du csv avec les changements
-    df = pd.DataFrame([item.dict() for item in items.values()])
+    # message de réponse, l'élément supprimé étant sérialisé directement en octets
+    response_data = {"message": f"Item {item_id} deleted successfully", "item": encode_stock_entry(item)}
 
-    df['total_price'] = df['quantity'] * df['unit_price']
+    return RawJSONResponse(response_data)
 
-    column_order = ['date', 'isin', 'company_name', 'quantity', 'unit_price', 'total_price', 'operation_type']
-    df = df[column_order]
 
-    df.to_csv(FILE_PATH, index=False)
+# définition d'une route en utilisant le décorateur
+@register_route("/portfolio/valuation", method="get", executor="thread")
+def get_valuation_history(start_date: str | None = None, end_date: str | None = None, portfolio: str = DEFAULT_PORTFOLIO):
+    """
+    Récupération sur l'API de la valeur du portefeuille, de son coût de revient (coût moyen pondéré),
+    du montant net investi (achats moins produits des ventes) et de la plus ou moins-value totale (réalisée et latente)
+    pour chaque jour de cotation entre deux dates
+    :param start_date: date de début (yyyy-mm-dd), par défaut la date de la première transaction
+    :param end_date: date de fin (yyyy-mm-dd), incluse, par défaut aujourd'hui
+    :param portfolio: nom du portefeuille
+    :return: {JSONResponse : {dates, value, cost_basis, net_invested, pnl}}
+    """
+    items = get_portfolio_items(portfolio)
+    for date in (start_date, end_date):
+        if date is not None:
+            try:
+                # Test de conversion de date en un objet datetime
+                datetime.strptime(date, "%Y-%m-%d")
+            except ValueError:
+                raise HTTPException(status_code=400, detail="format de date invalide. Veuillez entrer une date en format yyyy-mm-dd")
+
+    return RawJSONResponse(get_portfolio_valuation(items, start_date, end_date, portfolio))
+
+
+# définition d'une route en utilisant le décorateur
+@register_route("/portfolio/positions", method="get", executor="thread")
+def get_positions_history(as_of: str | None = None, portfolio: str = DEFAULT_PORTFOLIO):
+    """
+    Récupération sur l'API des positions du portefeuille à une date donnée (quantité, coût de revient, coût moyen
+    et plus ou moins-value réalisée par ISIN), à partir du dernier instantané de fin de mois antérieur à cette date
+    :param as_of: date de la requête (yyyy-mm-dd), transactions du jour incluses ; par défaut aujourd'hui
+    :param portfolio: nom du portefeuille
+    :return: {JSONResponse : {as_of, positions: {isin: position}}}
+    """
+    items = get_portfolio_items(portfolio)
+    as_of = as_of or datetime.now().strftime("%Y-%m-%d")
+    try:
+        # Test de conversion de date en un objet datetime
+        as_of = datetime.strptime(as_of, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="format de date invalide. Veuillez entrer une date en format yyyy-mm-dd")
 
-    # message de réponse
-    response_data =  {"message": f"Item {item} deleted successfully"}
+    return RawJSONResponse({"as_of": as_of, "positions": get_positions_as_of(portfolio, items, as_of)})
 
-    return JSONResponse(content=response_data)
 
+# définition d'une route en utilisant le décorateur
+@register_route("/portfolio/risk", method="get", executor="thread")
+def get_risk_analytics(years: int = 5, confidence: float = 0.95, include_matrices: bool = False,
+                       portfolio: str = DEFAULT_PORTFOLIO):
+    """
+    Récupération sur l'API des indicateurs de risque du portefeuille : volatilité, VaR / CVaR historiques
+    et paramétriques, drawdown maximal et contribution de chaque position au risque
+    :param years: profondeur de l'historique des rendements en années
+    :param confidence: niveau de confiance de la VaR et de la CVaR
+    :param include_matrices: inclure les matrices de covariance et de corrélation
+    :param portfolio: nom du portefeuille
+    :return: {JSONResponse : indicateurs de risque}
+    """
+    items = get_portfolio_items(portfolio)
+    if not 0 < confidence < 1:
+        raise HTTPException(status_code=400, detail="le niveau de confiance doit être compris entre 0 et 1")
+    if years <= 0:
+        raise HTTPException(status_code=400, detail="la profondeur de l'historique doit être positive")
+
+    return RawJSONResponse(get_portfolio_risk(items, years, confidence, include_matrices))
 
 
+# définition d'une route en utilisant le décorateur
+@register_route("/portfolios", method="get")
+def read_portfolios():
+    """
+    Récupération sur l'API de l'agrégat par ISIN de chaque portefeuille (quantités, montants achetés et vendus,
+    plus ou moins-values réalisées, prix moyens d'achat), recalculé uniquement pour les partitions modifiées
+    :return: {JSONResponse : {portefeuille: {isin: agrégat}}}
+    """
+    return RawJSONResponse({portfolio: aggregate_to_dict(get_portfolio_aggregate(portfolio, portfolio_items))
+                            for portfolio, portfolio_items in portfolios.items()})
 
+
+# définition d'une route en utilisant le décorateur
+@register_route("/portfolios/aggregate", method="get", executor="thread")
+def read_cross_portfolio_aggregate(names: list[str] | None = Query(None)):
+    """
+    Récupération sur l'API de l'agrégat par ISIN de plusieurs portefeuilles, combiné à partir des agrégats de chaque partition
+    :param names: noms des portefeuilles à combiner (par défaut, tous)
+    :return: {JSONResponse : {isin: agrégat}}
+    """
+    selected = {portfolio: get_portfolio_items(portfolio) for portfolio in names} if names else portfolios
+    return RawJSONResponse(aggregate_to_dict(get_cross_portfolio_aggregate(selected)))
+
+
+# définition d'une route en utilisant le décorateur
+@register_route("/live", method="get")
+async def live_updates(portfolio: str | None = None):
+    """
+    Abonnement aux mises-à-jour des positions (Server-Sent Events) : un message « snapshot » avec l'état complet,
+    puis uniquement les champs modifiés par ISIN (prix, quantités, plus ou moins-values), au plus un message par intervalle
+    :param portfolio: nom du portefeuille suivi (par défaut, tous les portefeuilles confondus)
+    :return: StreamingResponse text/event-stream
+    """
+    # vérification que le portefeuille existe (400 / 404 sinon)
+    if portfolio is not None:
+        get_portfolio_items(portfolio)
+    return StreamingResponse(live_broker.subscribe(portfolio), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+# définition d'une route en utilisant le décorateur
+@register_route("/metrics/routes", method="get")
+def read_route_metrics():
+    """
+    Récupération sur l'API des temps d'exécution mesurés pour chaque route définie avec le décorateur
+    :return: {JSONResponse : {"MÉTHODE chemin": {count, errors, total_time, max_time, average_time}}}
+    """
+    return RawJSONResponse(get_route_metrics())
+
+
+# définition d'une route en utilisant le décorateur
+@register_route("/symbols/autocomplete", method="get")
+def autocomplete_symbols(q: str, limit: int = 10):
+    """
+    Autocomplétion des symboles boursiers pour le formulaire d'ajout de transaction, à partir du référentiel local
+    :param q: début du symbole ou du nom de l'entreprise
+    :param limit: nombre maximal de résultats
+    :return: {JSONResponse : [{symbol, name}]}
+    """
+    return RawJSONResponse(symbol_master.search(q, limit))
@@ -10,3 +10,48 @@ FILE_PATH = os.path.join(CURRENT_DIRECTORY, "updated_stock_transactions.csv")
 #Configuration du host et du port
 HOST = "127.0.0.1"
 PORT = 8012
+
+# Configuration du rafraîchissement des prix en tâche de fond
+# (intervalle en secondes, nombre de tickers par téléchargement, nombre maximal d'appels à Yahoo Finance par minute)
+PRICE_REFRESH_INTERVAL = 60
+PRICE_REFRESH_BATCH_SIZE = 50
+PRICE_REFRESH_CALLS_PER_MINUTE = 30
+# Profondeur de l'historique des prix téléchargé au premier chargement d'un ticker (même valeur par défaut que yf.download),
+# puis fenêtre récente téléchargée à chaque rafraîchissement et fusionnée dans l'historique conservé
+PRICE_HISTORY_PERIOD = "max"
+PRICE_REFRESH_PERIOD = "5d"
+
+# Diffusion des mises-à-jour des positions (Server-Sent Events) :
+# intervalle minimal en secondes entre deux messages et délai d'envoi d'un message de maintien de connexion
+LIVE_UPDATE_INTERVAL = 1
+LIVE_UPDATE_KEEP_ALIVE = 15
+
+# Méthodes HTTP prises en charge par le décorateur
+SUPPORTED_HTTP_METHODS = ["get", "post", "put", "delete", "patch"]
+
+# Routes par lot (/batch) générées par le décorateur :
+# nombre maximal d'appels simultanés et nombre maximal d'éléments par lot
+BATCH_CONCURRENCY = 16
+BATCH_MAX_SIZE = 1000
+
+# Taille des pools dédiés aux routes (option executor du décorateur)
+THREAD_POOL_WORKERS = 8
+PROCESS_POOL_WORKERS = os.cpu_count() or 1
+
+# Durée de mise en cache en secondes des prix ajustés téléchargés pour une période (YahooFinanceDataLoader.compute_total_returns)
+ADJ_CLOSE_CACHE_TTL = 3600
+
+# Nombre de mises-à-jour incrémentales du moteur de risque entre deux vérifications contre un recalcul complet
+RISK_ENGINE_CHECK_INTERVAL = 20
+
+# Référentiel local des symboles boursiers (csv avec les colonnes symbol et name),
+# utilisé pour l'autocomplétion, les noms d'entreprise et la validation des symboles saisis
+SYMBOL_MASTER_PATH = os.path.join(CURRENT_DIRECTORY, "symbols.csv")
+# True si le référentiel est exhaustif (listing complet) : un symbole absent est alors refusé sans appel réseau ;
+# sinon un symbole absent n'est accepté que s'il est trouvé sur Yahoo Finance
+SYMBOL_MASTER_AUTHORITATIVE = False
+
+# Portefeuilles : le portefeuille par défaut est stocké dans FILE_PATH,
+# chaque autre portefeuille dans son propre fichier csv (partition) de ce répertoire
+DEFAULT_PORTFOLIO = "default"
+PORTFOLIOS_DIRECTORY = os.path.join(CURRENT_DIRECTORY, "portfolios")
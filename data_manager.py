@@ -1,7 +1,9 @@
 from dataclasses import dataclass
 import pandas as pd
 import yfinance as yf
+from config import ADJ_CLOSE_CACHE_TTL
 from utils import cache
+from symbol_master import symbol_master
 from fastapi import HTTPException
 import pandas as pd
 from fastapi import HTTPException
@@ -71,7 +73,8 @@ class YahooFinanceDataLoader:
         # Télécharger les données si elles ne sont pas dans le cache
         returns_history = YahooFinanceDataLoader.compute_total_return(ticker_symbol, start_date, end_date)
         asset = yf.Ticker(ticker_symbol)
-        name_asset = asset.info['shortName']
+        # Nom lu dans le référentiel local, appel réseau uniquement pour un symbole inconnu
+        name_asset = symbol_master.get_name(ticker_symbol) or asset.info['shortName']
         curr_price = asset.history(period="1d")["Close"].iloc[0]
 
         return YahooFinanceData.from_data_loader(ticker_symbol, returns_history, name_asset, curr_price)
@@ -92,6 +95,47 @@ class YahooFinanceDataLoader:
         df = yf.download(ticker, start=start_date, end=end_date)
         return df['Adj Close']
 
+    @staticmethod
+    def compute_total_returns(tickers, start_date=None, end_date=None):
+        """
+        Récupère en un seul téléchargement l'historique des prix ajustés (Adj Close) de plusieurs actifs,
+        mis en cache pendant ADJ_CLOSE_CACHE_TTL secondes.
+
+        Args:
+            tickers (list[str]): Symboles boursiers des actifs.
+            start_date (datetime, optional): Date de début de la période. Defaults à None.
+            end_date (datetime, optional): Date de fin de la période (exclue). Defaults à None.
+
+        Returns:
+            pd.DataFrame: DataFrame indexé par date avec une colonne par ticker.
+        """
+        key = ("adj_close", tuple(tickers), str(start_date), str(end_date))
+        prices = cache.get_cache(key)
+        if prices is None:
+            prices = YahooFinanceDataLoader.download_adj_close(tickers, start_date, end_date)
+            # durée limitée : la clé dépend de la période demandée, qui change d'un appel à l'autre
+            cache.set_cache(key, prices, ttl=ADJ_CLOSE_CACHE_TTL)
+        return prices
+
+    @staticmethod
+    def download_adj_close(tickers, start_date=None, end_date=None):
+        """
+        Télécharge en un seul appel, sans mise en cache, les prix ajustés (Adj Close) de plusieurs actifs.
+
+        Args:
+            tickers (list[str]): Symboles boursiers des actifs.
+            start_date (datetime, optional): Date de début de la période. Defaults à None.
+            end_date (datetime, optional): Date de fin de la période (exclue). Defaults à None.
+
+        Returns:
+            pd.DataFrame: DataFrame indexé par date avec une colonne par ticker, dans l'ordre de tickers.
+        """
+        prices = yf.download(list(tickers), start=start_date, end=end_date, progress=False)['Adj Close']
+        # yfinance renvoie une Series lorsqu'un seul ticker est demandé
+        if isinstance(prices, pd.Series):
+            prices = prices.to_frame(tickers[0])
+        return prices.reindex(columns=list(tickers))
+
 
 
 
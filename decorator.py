@@ -4,16 +4,27 @@ import pandas as pd
 from data_manager import *
 from config import *
 from main import *
+from route_policies import apply_route_policies, build_batch_endpoint, get_batch_path
 app = FastAPI(debug=True)  # Création d'une instance de l'application FastAPI avec le mode débogage activé
 
-def decorator(path: str, methods: list):
+def decorator(path: str, methods: list, cache_ttl=None, timeout=None, max_concurrency=None, rate_limit=None,
+              batch=False, batch_handler=None, executor=None):
     """
     Un décorateur pour créer dynamiquement des routes dans une application FastAPI.
     Il permet de définir une route avec des méthodes HTTP spécifiées dans la liste 'methods'.
+    Chaque route est chronométrée et peut recevoir des règles de performance.
 
     Args:
         path (str): Le chemin d'accès (endpoint) de la route.
         methods (list): Une liste des méthodes HTTP à supporter pour cette route (par exemple, GET, POST).
+        cache_ttl (float, optional): Durée de mise en cache de la réponse en secondes.
+        timeout (float, optional): Durée maximale d'exécution en secondes (504 au-delà).
+        max_concurrency (int, optional): Nombre maximal d'exécutions simultanées (503 au-delà).
+        rate_limit (tuple[int, float], optional): (nombre de requêtes, fenêtre en secondes) autorisé par IP (429 au-delà).
+        batch (bool, optional): Enregistre aussi une route POST <path sans paramètres>/batch recevant une liste de jeux d'arguments.
+        batch_handler (Callable, optional): Implémentation vectorisée de la route /batch (liste d'arguments -> liste de résultats).
+        executor (str, optional): "loop", "thread" (pool de threads dédié) ou "process" (pool de processus pour les calculs
+            qui monopolisent le GIL). Par défaut, le comportement de FastAPI.
 
     Returns:
         Function: La fonction décorée, maintenant liée aux routes et méthodes HTTP spécifiées.
@@ -21,15 +32,25 @@ def decorator(path: str, methods: list):
     def decorator(func):
         # Itération sur chaque méthode HTTP fournie dans la liste
         for method in methods:
+            # Application des règles de performance (une instance par méthode)
+            endpoint = apply_route_policies(func, path, method, cache_ttl=cache_ttl, timeout=timeout,
+                                            max_concurrency=max_concurrency, rate_limit=rate_limit, executor=executor)
             # Association de la fonction avec la route et la méthode HTTP correspondante
             if method.lower() == 'get':
-                app.get(path)(func)
+                app.get(path)(endpoint)
             elif method.lower() == 'post':
-                app.post(path)(func)
+                app.post(path)(endpoint)
             elif method.lower() == 'put':
-                app.put(path)(func)
+                app.put(path)(endpoint)
             elif method.lower() == 'delete':
-                app.delete(path)(func)
+                app.delete(path)(endpoint)
+
+        if batch:
+            # Variante par lot de la route, validée avec la même signature
+            batch_endpoint = apply_route_policies(build_batch_endpoint(func, batch_handler, executor=executor),
+                                                  get_batch_path(path), 'post',
+                                                  timeout=timeout, max_concurrency=max_concurrency, rate_limit=rate_limit)
+            app.post(get_batch_path(path))(batch_endpoint)
 
         return func  # Retourne la fonction décorée
     return decorator
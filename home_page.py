@@ -4,8 +4,9 @@ from models import *
 from data_manager import *
 from datetime import datetime, timedelta
 import pandas as pd
+import asyncio
 
-def get_net_position(item_dict):
+def get_net_position(item_dict, price_refresher=None):
     """
     Calcule la position nette pour chaque ISIN en tenant compte des achats et des ventes.
 
@@ -13,10 +14,36 @@ def get_net_position(item_dict):
         item_dict (dict): Un dictionnaire contenant des objets représentant des opérations boursières.
                           Chaque clé est un identifiant unique et chaque valeur est un objet avec des attributs tels que
                           ISIN, quantité et type d'opération.
+        price_refresher (PriceRefresher, optional): Si renseigné, les prix sont lus dans son instantané
+                          (éventuellement périmé) au lieu d'être téléchargés à chaque appel.
 
     Returns:
         dict: Un dictionnaire de positions nettes, où chaque clé est un identifiant unique et chaque valeur
-              est un objet NetPosition représentant la position nette pour un ISIN donné.
+              est un objet NetPosition représentant la position nette pour un ISIN donné
+              (sans prix ni valorisation si le prix est absent de l'instantané).
+    """
+    quantities = get_net_quantities(item_dict)
+    if price_refresher is not None:
+        # les ISIN absents de l'instantané sont confiés à la tâche de fond, sans attendre le réseau
+        price_refresher.request(list(quantities))
+
+    net_positions_dict = {}
+    # Création d'un objet NetPosition par ISIN
+    for index, (isin, total_quantity) in enumerate(quantities.items()):
+        net_positions_dict[index] = build_net_position(index, isin, total_quantity, price_refresher)
+
+    return net_positions_dict
+
+
+def get_net_quantities(item_dict):
+    """
+    Calcule la quantité nette détenue pour chaque ISIN (achats moins ventes).
+
+    Args:
+        item_dict (dict): Un dictionnaire {id: StockEntry} des opérations boursières.
+
+    Returns:
+        dict: Un dictionnaire {isin: quantité nette}, dans l'ordre de première apparition des ISIN.
     """
     totals = {}
     # Parcours des éléments dans item_dict
@@ -39,23 +66,67 @@ def get_net_position(item_dict):
                 totals[isin] = -quantity
             else:
                 totals[isin] = quantity
+    return totals
 
-    # Conversion du dictionnaire totals en DataFrame pour un traitement plus aisé
-    grouped = pd.DataFrame(list(totals.items()), columns=['isin', 'total_quantity'])
 
-    net_positions_dict = {}
-    # Parcours du DataFrame pour créer des objets NetPosition
-    for index, row in grouped.iterrows():
+def build_net_position(index, isin, total_quantity, price_refresher=None):
+    """
+    Récupère le prix d'un ISIN et crée l'objet NetPosition correspondant (appel potentiellement bloquant).
+
+    Args:
+        index (int): Identifiant de la position.
+        isin (str): Code ISIN de l'action.
+        total_quantity (float): Quantité nette détenue.
+        price_refresher (PriceRefresher, optional): Si renseigné, le prix est lu dans son instantané.
+
+    Returns:
+        NetPosition: La position nette valorisée, ou sans prix ni valorisation si le prix est absent de l'instantané.
+    """
+    if price_refresher is not None:
+        # Lecture du prix dans l'instantané
+        data = price_refresher.get_quote(isin)
+        if data is None:
+            # prix pas encore récupéré (ou Yahoo Finance indisponible) : la ligne est affichée sans prix
+            return NetPosition(id=index, isin=isin, quantity_in_portfolio=total_quantity)
+        price_updated_at = data.updated_at.isoformat()
+    else:
         # Obtention des données historiques pour l'ISIN
-        data = YahooFinanceDataLoader.get_historic_returns(row['isin'])
-        # Création de l'objet NetPosition avec les informations calculées et obtenues
-        net_positions = NetPosition(id=index,
-                                    isin=row['isin'],
-                                    quantity_in_portfolio=row['total_quantity'],
-                                    current_price=data.current_price,
-                                    net_position=row['total_quantity'] * data.current_price,
-                                    price_history=data.returns_history.to_dict())
-        # Ajout de l'objet NetPosition au dictionnaire
-        net_positions_dict[index] = net_positions
+        data = YahooFinanceDataLoader.get_historic_returns(isin)
+        price_updated_at = None
+    # Création de l'objet NetPosition avec les informations calculées et obtenues
+    return NetPosition(id=index,
+                       isin=isin,
+                       quantity_in_portfolio=total_quantity,
+                       current_price=data.current_price,
+                       net_position=total_quantity * data.current_price,
+                       price_history=data.returns_history.to_dict(),
+                       price_updated_at=price_updated_at)
 
-    return net_positions_dict
+
+async def stream_net_positions(item_dict, price_refresher=None):
+    """
+    Génère les positions nettes au fur et à mesure que leur prix est obtenu, dans l'ordre d'arrivée.
+    Les récupérations de prix sont lancées en parallèle dans des threads.
+
+    Args:
+        item_dict (dict): Un dictionnaire {id: StockEntry} des opérations boursières.
+        price_refresher (PriceRefresher, optional): Si renseigné, les prix sont lus dans son instantané et toutes
+            les positions sont envoyées immédiatement (sans prix pour les ISIN absents, demandés à la tâche de fond).
+
+    Yields:
+        NetPosition: Chaque position nette dès que son prix est disponible.
+    """
+    if price_refresher is not None:
+        for net_position in get_net_position(item_dict, price_refresher).values():
+            yield net_position
+        return
+
+    tasks = [asyncio.create_task(asyncio.to_thread(build_net_position, index, isin, total_quantity, price_refresher))
+             for index, (isin, total_quantity) in enumerate(get_net_quantities(item_dict).items())]
+    try:
+        for next_position in asyncio.as_completed(tasks):
+            yield await next_position
+    finally:
+        # annulation des récupérations restantes si le client se déconnecte
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,192 @@
+import asyncio
+
+from config import *
+from methods import get_store_version
+from portfolios import aggregate_to_dict, get_cross_portfolio_aggregate
+from serialization import dumps
+
+
+class Subscription:
+    """
+    Abonnement d'un client au flux de mises-à-jour : les différences reçues entre deux envois
+    sont fusionnées, de sorte qu'un client ne reçoit qu'un seul message par intervalle.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.event = asyncio.Event()
+
+    def push(self, diff):
+        """
+        Fusionne une différence dans les modifications en attente d'envoi.
+
+        Args:
+            diff (dict): Différences {isin: {champ: valeur}} (None si l'ISIN a disparu).
+        """
+        for isin, fields in diff.items():
+            if fields is None or self.pending.get(isin, {}) is None:
+                self.pending[isin] = fields
+            else:
+                self.pending.setdefault(isin, {}).update(fields)
+        self.event.set()
+
+    def pop(self):
+        """
+        Retourne et vide les modifications en attente.
+
+        Returns:
+            dict: Les différences fusionnées depuis le dernier envoi.
+        """
+        pending, self.pending = self.pending, {}
+        self.event.clear()
+        return pending
+
+
+class LiveUpdateBroker:
+    """
+    Diffuse aux clients abonnés (Server-Sent Events) les champs modifiés de chaque position nette
+    lorsque l'inventaire des transactions ou l'instantané des prix change.
+
+    Chaque client s'abonne aux positions d'un portefeuille ou, à défaut, à celles de tous les portefeuilles :
+    un état publié et un ensemble d'abonnements sont conservés par canal (nom du portefeuille, ou None).
+    Les changements sont détectés à intervalle régulier : une rafale de modifications ne produit
+    qu'un seul message par intervalle.
+    """
+
+    def __init__(self, portfolio_source, price_refresher, interval=LIVE_UPDATE_INTERVAL, keep_alive=LIVE_UPDATE_KEEP_ALIVE):
+        """
+        Args:
+            portfolio_source (Callable[[], dict]): Fonction retournant le dictionnaire {portefeuille: {id: StockEntry}}.
+            price_refresher (PriceRefresher): Source de l'instantané des prix (aucun appel réseau n'est fait ici).
+            interval (float): Intervalle minimal en secondes entre deux messages.
+            keep_alive (float): Délai en secondes au-delà duquel un commentaire est envoyé pour garder la connexion.
+        """
+        self.portfolio_source = portfolio_source
+        self.price_refresher = price_refresher
+        self.interval = interval
+        self.keep_alive = keep_alive
+        # états publiés et abonnements, par canal (nom du portefeuille, ou None pour tous les portefeuilles)
+        self.states = {}
+        self.subscriptions = {}
+        self._versions = None
+        self._task = None
+
+    def compute_state(self, portfolio=None):
+        """
+        Calcule l'état publié de chaque position d'un portefeuille, ou de tous les portefeuilles confondus,
+        à partir des agrégats par portefeuille (recalculés uniquement pour les partitions modifiées)
+        et de l'instantané des prix.
+
+        Args:
+            portfolio (str, optional): Le nom du portefeuille. Par défaut, tous les portefeuilles.
+
+        Returns:
+            dict: {isin: {champ: valeur}} pour chaque ISIN de l'inventaire.
+        """
+        portfolios = self.portfolio_source()
+        if portfolio is not None:
+            portfolios = {portfolio: portfolios.get(portfolio, {})}
+        state = {}
+        for isin, aggregate in aggregate_to_dict(get_cross_portfolio_aggregate(portfolios)).items():
+            quantity = aggregate["net_quantity"]
+            quote = self.price_refresher.snapshot.get(isin)
+            current_price = quote.current_price if quote else None
+            state[isin] = {
+                "quantity_in_portfolio": quantity,
+                "current_price": current_price,
+                "net_position": quantity * current_price if quote else None,
+                "latent_gain": round(quantity * (current_price - aggregate["average_buy_price"]), 2) if quote else None,
+                "realized_gain": aggregate["realized_gain"],
+                "price_updated_at": quote.updated_at.isoformat() if quote else None,
+            }
+        return state
+
+    def publish(self, portfolio=None):
+        """
+        Recalcule l'état d'un canal, en déduit les champs modifiés depuis sa dernière publication
+        et les transmet à chacun de ses abonnés.
+
+        Args:
+            portfolio (str, optional): Le canal : nom du portefeuille, ou None pour tous les portefeuilles.
+
+        Returns:
+            dict: Les différences publiées.
+        """
+        state = self.compute_state(portfolio)
+        published = self.states.get(portfolio, {})
+        diff = {}
+        for isin, fields in state.items():
+            previous = published.get(isin, {})
+            changed = {field: value for field, value in fields.items() if previous.get(field) != value}
+            if changed:
+                diff[isin] = changed
+        for isin in published.keys() - state.keys():
+            diff[isin] = None
+        self.states[portfolio] = state
+
+        if diff:
+            for subscription in self.subscriptions.get(portfolio, ()):
+                subscription.push(diff)
+        return diff
+
+    async def run(self):
+        """Boucle de détection des changements (inventaire ou prix), exécutée jusqu'à l'annulation de la tâche."""
+        while True:
+            versions = (get_store_version(), self.price_refresher.version)
+            if versions != self._versions and self.subscriptions:
+                for portfolio in list(self.subscriptions):
+                    self.publish(portfolio)
+                self._versions = versions
+            await asyncio.sleep(self.interval)
+
+    async def subscribe(self, portfolio=None):
+        """
+        Génère le flux Server-Sent Events d'un client : un message « snapshot » avec l'état complet,
+        puis des messages « diff » ne contenant que les champs modifiés.
+
+        Args:
+            portfolio (str, optional): Le portefeuille suivi. Par défaut, tous les portefeuilles.
+
+        Yields:
+            str: Les messages au format text/event-stream.
+        """
+        # état à jour envoyé en entier au seul nouvel abonné : les autres abonnés du canal ne reçoivent les changements
+        # qu'à la prochaine publication, pour qu'une rafale de connexions ne multiplie pas les messages
+        snapshot = self.compute_state(portfolio)
+        # premier abonné du canal : l'état envoyé devient l'état publié, base des différences suivantes
+        self.states.setdefault(portfolio, snapshot)
+        subscription = Subscription()
+        self.subscriptions.setdefault(portfolio, set()).add(subscription)
+        try:
+            yield f"event: snapshot\ndata: {dumps(snapshot).decode()}\n\n"
+            while True:
+                try:
+                    await asyncio.wait_for(subscription.event.wait(), timeout=self.keep_alive)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                diff = subscription.pop()
+                if diff:
+                    yield f"event: diff\ndata: {dumps(diff).decode()}\n\n"
+        finally:
+            # un canal sans abonné n'est plus suivi
+            subscriptions = self.subscriptions.get(portfolio, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(portfolio, None)
+                self.states.pop(portfolio, None)
+
+    def start(self):
+        """Démarre la tâche de fond sur la boucle d'événements courante."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Arrête la tâche de fond."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -1,28 +1,145 @@
 from fastapi import APIRouter, HTTPException
 from data_manager import *
-from config import FILE_PATH
+from config import FILE_PATH, DEFAULT_PORTFOLIO, PORTFOLIOS_DIRECTORY, SYMBOL_MASTER_AUTHORITATIVE
 from models import *
+from serialization import stock_entries_to_records
 from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+import os
 import re
 import yfinance as yf
+from symbol_master import symbol_master
 
 yf.pdr_override()
 from datetime import datetime, timedelta
 
+# Version de l'inventaire des transactions, incrémentée à chaque ajout / modification / suppression
+# (permet d'invalider les calculs mis en cache sur l'inventaire), globale et par portefeuille
+_store_version = 0
+_portfolio_versions = {}
 
-def get_item_dict():
+# Colonnes des fichiers csv de transactions (le portefeuille est donné par le fichier lui-même)
+CSV_COLUMNS = ['date', 'isin', 'company_name', 'quantity', 'unit_price', 'total_price', 'operation_type']
+
+
+def get_store_version(portfolio=None):
+    """
+    Retourne la version courante de l'inventaire des transactions.
+
+    Args:
+        portfolio (str, optional): Si renseigné, version de la partition de ce portefeuille uniquement.
+
+    Returns:
+        int: Le numéro de version de l'inventaire (ou du portefeuille).
+    """
+    if portfolio is not None:
+        return _portfolio_versions.get(portfolio, 0)
+    return _store_version
+
+
+def bump_store_version(portfolio=DEFAULT_PORTFOLIO):
+    """
+    Incrémente la version de l'inventaire des transactions après une modification.
+
+    Args:
+        portfolio (str): Le portefeuille modifié.
+
+    Returns:
+        int: Le nouveau numéro de version global.
+    """
+    global _store_version
+    _store_version += 1
+    _portfolio_versions[portfolio] = _portfolio_versions.get(portfolio, 0) + 1
+    return _store_version
+
+
+def is_valid_portfolio_name(portfolio):
+    """
+    Vérifie qu'un nom de portefeuille est valide (il sert de nom de fichier pour sa partition).
+
+    Args:
+        portfolio (str): Le nom du portefeuille.
+
+    Returns:
+        bool: True si le nom ne contient que des lettres, chiffres, tirets et underscores.
+    """
+    return bool(re.match(r'^[A-Za-z0-9_\-]+$', portfolio))
+
+
+def get_portfolio_file_path(portfolio=DEFAULT_PORTFOLIO):
+    """
+    Retourne le chemin du fichier csv qui contient les transactions d'un portefeuille.
+    Le portefeuille par défaut reste stocké dans FILE_PATH, les autres dans PORTFOLIOS_DIRECTORY.
+
+    Args:
+        portfolio (str): Le nom du portefeuille.
+
+    Returns:
+        str: Le chemin du fichier csv de la partition.
+    """
+    if portfolio == DEFAULT_PORTFOLIO:
+        return FILE_PATH
+    return os.path.join(PORTFOLIOS_DIRECTORY, f"{portfolio}.csv")
+
+
+def list_portfolios():
     """
-    Crée et retourne un dictionnaire d'entrées boursières à partir d'un fichier CSV.
+    Liste les portefeuilles existants (le portefeuille par défaut et un par fichier de PORTFOLIOS_DIRECTORY).
+
+    Returns:
+        list[str]: Les noms des portefeuilles.
+    """
+    portfolios = [DEFAULT_PORTFOLIO]
+    if os.path.isdir(PORTFOLIOS_DIRECTORY):
+        portfolios += sorted(os.path.splitext(file_name)[0] for file_name in os.listdir(PORTFOLIOS_DIRECTORY)
+                             if file_name.endswith(".csv") and os.path.splitext(file_name)[0] != DEFAULT_PORTFOLIO)
+    return portfolios
+
+
+def load_all_portfolios():
+    """
+    Charge en parallèle les partitions de tous les portefeuilles.
+
+    Returns:
+        Dict[str, Dict[int, StockEntry]]: Dictionnaire {portefeuille: {id: StockEntry}}.
+    """
+    portfolios = list_portfolios()
+    with ThreadPoolExecutor() as executor:
+        return dict(zip(portfolios, executor.map(get_item_dict, portfolios)))
+
+
+def write_portfolio_csv(portfolio, item_dict):
+    """
+    Réécrit le fichier csv de la partition d'un portefeuille à partir de ses transactions.
+
+    Args:
+        portfolio (str): Le nom du portefeuille.
+        item_dict (Dict[int, StockEntry]): Les transactions du portefeuille.
+    """
+    # operation_type converti en str sans modifier les éléments
+    df = pd.DataFrame(stock_entries_to_records(item_dict.values()), columns=CSV_COLUMNS)
+    df['total_price'] = df['quantity'] * df['unit_price']
+    file_path = get_portfolio_file_path(portfolio)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    write_csv(df[CSV_COLUMNS], file_path)
+
+
+def get_item_dict(portfolio=DEFAULT_PORTFOLIO):
+    """
+    Crée et retourne un dictionnaire d'entrées boursières à partir du fichier CSV d'un portefeuille.
     Chaque ligne du CSV est convertie en une entrée de stock (StockEntry), avec des vérifications
     sur la validité du type d'opération et du symbole ISIN.
 
+    Args:
+        portfolio (str): Le nom du portefeuille (par défaut, celui de FILE_PATH).
+
     Raises:
         HTTPException: Levée si le type d'opération ou le symbole ISIN est invalide.
 
     Returns:
         Dict[int, StockEntry]: Dictionnaire où chaque clé est un index de ligne et chaque valeur est un StockEntry.
     """
-    df = read_csv(FILE_PATH)
+    df = read_csv(get_portfolio_file_path(portfolio))
     item_dict: Dict[int, StockEntry] = {}
     for index, row in df.iterrows():
         # Vérifier et traiter le type d'opération
@@ -43,7 +160,8 @@ def get_item_dict():
                               company_name=row['company_name'],
                               quantity=row['quantity'],
                               unit_price=row['unit_price'],
-                              operation_type=str(row['operation_type']).lower())
+                              operation_type=str(row['operation_type']).lower(),
+                              portfolio=portfolio)
             item_dict[index] = item
     return item_dict
 
@@ -64,6 +182,10 @@ def get_unit_price(date, isin):
     jcinq = date_obj - timedelta(days=5)
     historical_data = yf.download(isin, start=jcinq, end=date_obj)
 
+    # aucun cours sur la période : symbole inconnu de Yahoo Finance ou date hors cotation
+    if historical_data.empty:
+        raise HTTPException(status_code=400, detail=f"aucun cours trouvé pour {isin} avant le {date}")
+
     last_close_price = historical_data['Close'].iloc[-1]
     last_close_date = historical_data.index[-1].strftime('%Y-%m-%d')
     return {"date": last_close_date, "price": last_close_price}
@@ -100,18 +222,69 @@ def is_valid_yfinance_ticker(string_variable):
     return bool(re.match(pattern, string_variable))
 
 
-def calculate_portfolio_gains(items_net_positions):
+def get_company_name(ticker):
+    """
+    Retourne le nom de l'entreprise associé à un symbole boursier : lu dans le référentiel local des symboles,
+    puis, pour un symbole absent d'un référentiel non exhaustif (SYMBOL_MASTER_AUTHORITATIVE), récupéré sur Yahoo Finance.
+    Sert aussi à valider les symboles saisis : un symbole sans nom est considéré comme inconnu.
+
+    Args:
+        ticker (str): Le symbole boursier.
+
+    Returns:
+        str | None: Le nom de l'entreprise, ou None si le symbole est inconnu.
+    """
+    name = symbol_master.get_name(ticker)
+    if name or SYMBOL_MASTER_AUTHORITATIVE:
+        return name
+    try:
+        return yf.Ticker(ticker).info.get('shortName')
+    except Exception:
+        return None
+
+
+def calculate_portfolio_gains(items_net_positions, portfolio=DEFAULT_PORTFOLIO):
     """
     Calcule les gains réalisés et latents pour un portefeuille d'actions.
 
     Args:
         items_net_positions (Dict[str, NetPosition]): Un dictionnaire de positions nettes dans le portefeuille.
+        portfolio (str): Le nom du portefeuille.
 
     Returns:
         Tuple[Dict[str, float], Dict[str, float]]: Deux dictionnaires contenant les gains réalisés et latents.
         Le premier dictionnaire mappe l'ISIN à ses gains réalisés, tandis que le second mappe l'ISIN à ses gains latents.
     """
-    df = pd.read_csv(FILE_PATH)
+    buys, sells = load_buy_and_sell_operations(portfolio)
+
+    # Remplacement des NaN par zéro pour les calculs
+    buy_costs = buys.groupby('isin')['total_price'].sum().fillna(0)
+    sell_revenues = sells.groupby('isin')['total_price'].sum().fillna(0)
+
+    # Calcul des gains réalisés
+    raw_gains = sell_revenues - buy_costs
+    gains = {isin: round(value, 2) for isin, value in raw_gains.items() if pd.notna(value) and value != 0}
+
+    # Calcul des gains latents
+    average_buy_prices = get_average_buy_prices(buys)
+    latent_gains = {}
+    for id, net_position in items_net_positions.items():
+        latent_gains[net_position.isin] = calculate_latent_gain(net_position, average_buy_prices)
+
+    return gains, latent_gains
+
+
+def load_buy_and_sell_operations(portfolio=DEFAULT_PORTFOLIO):
+    """
+    Lit le fichier csv des transactions d'un portefeuille et sépare les achats des ventes.
+
+    Args:
+        portfolio (str): Le nom du portefeuille.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: Les opérations d'achat et les opérations de vente.
+    """
+    df = pd.read_csv(get_portfolio_file_path(portfolio))
 
     # Conversion de la date au format standard et filtrage des lignes invalides
     df['date'] = pd.to_datetime(df['date'], errors='coerce')
@@ -128,29 +301,43 @@ def calculate_portfolio_gains(items_net_positions):
     buys = df[df['operation_type'].isin(buy_ops)]
     sells = df[df['operation_type'].isin(sell_ops)]
 
-    # Remplacement des NaN par zéro pour les calculs
-    buy_costs = buys.groupby('isin')['total_price'].sum().fillna(0)
-    sell_revenues = sells.groupby('isin')['total_price'].sum().fillna(0)
+    return buys, sells
 
-    # Calcul des gains réalisés
-    raw_gains = sell_revenues - buy_costs
-    gains = {isin: round(value, 2) for isin, value in raw_gains.items() if pd.notna(value) and value != 0}
 
-    # Calcul des gains latents
-    latent_gains = {}
-    for id, net_position in items_net_positions.items():
-        isin = net_position.isin
-        quantity_in_portfolio = net_position.quantity_in_portfolio
-        current_price = net_position.current_price
+def get_average_buy_prices(buys=None, portfolio=DEFAULT_PORTFOLIO):
+    """
+    Calcule le prix moyen d'achat de chaque ISIN.
 
-        # Calcul du prix moyen d'achat
-        average_buy_price = 0
-        if isin in buys['isin'].values:
-            average_buy_price = buys[buys['isin'] == isin]['total_price'].sum() / buys[buys['isin'] == isin][
-                'quantity'].sum()
+    Args:
+        buys (pd.DataFrame, optional): Les opérations d'achat. Par défaut, lues dans le fichier csv du portefeuille.
+        portfolio (str): Le nom du portefeuille.
 
-        # Calcul de la plus ou moins-value latente
-        latent_gain = quantity_in_portfolio * (current_price - average_buy_price)
-        latent_gains[isin] = round(latent_gain, 2)  # Arrondi à deux décimales
+    Returns:
+        Dict[str, float]: Un dictionnaire {isin: prix moyen d'achat}.
+    """
+    if buys is None:
+        buys, sells = load_buy_and_sell_operations(portfolio)
+    grouped = buys.groupby('isin')[['total_price', 'quantity']].sum()
+    return (grouped['total_price'] / grouped['quantity']).to_dict()
 
-    return gains, latent_gains
+
+def calculate_latent_gain(net_position, average_buy_prices):
+    """
+    Calcule la plus ou moins-value latente d'une position nette.
+
+    Args:
+        net_position (NetPosition): La position nette valorisée.
+        average_buy_prices (Dict[str, float]): Les prix moyens d'achat par ISIN.
+
+    Returns:
+        float | None: La plus ou moins-value latente, arrondie à deux décimales (None si le prix est inconnu).
+    """
+    if net_position.current_price is None:
+        return None
+
+    # Prix moyen d'achat (0 si l'ISIN n'a jamais été acheté)
+    average_buy_price = average_buy_prices.get(net_position.isin, 0)
+
+    # Calcul de la plus ou moins-value latente
+    latent_gain = net_position.quantity_in_portfolio * (net_position.current_price - average_buy_price)
+    return round(latent_gain, 2)  # Arrondi à deux décimales
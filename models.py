@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from enum import Enum
+from config import DEFAULT_PORTFOLIO
 
 class OperationType(Enum):
     """
@@ -22,6 +23,7 @@ class StockEntry(BaseModel):
         quantity (float): Quantité d'actions.
         unit_price (float): Prix unitaire de l'action.
         operation_type (OperationType): Type d'opération (achat, vente, etc.).
+        portfolio (str): Portefeuille auquel appartient l'opération.
     """
     date: str
     isin: str
@@ -29,6 +31,7 @@ class StockEntry(BaseModel):
     quantity: float
     unit_price: float
     operation_type: OperationType
+    portfolio: str = DEFAULT_PORTFOLIO
 
 
 class UpdateStockEntry(BaseModel):
@@ -70,15 +73,17 @@ class NetPosition(BaseModel):
     Attributs:
         isin (str): Code ISIN de l'action.
         quantity_in_portfolio (float): Quantité totale de l'action dans le portefeuille.
-        current_price (float): Prix actuel de l'action.
-        net_position (float): Position nette de l'action (quantité * prix actuel).
+        current_price (float | None): Prix actuel de l'action (None s'il n'a pas encore pu être récupéré).
+        net_position (float | None): Position nette de l'action (quantité * prix actuel), None sans prix.
         price_history (dict): Historique des prix de l'action.
+        price_updated_at (str | None): Date et heure de récupération du prix actuel (fraîcheur de la donnée).
     """
     isin: str
     quantity_in_portfolio: float
-    current_price: float
-    net_position: float
-    price_history: dict
+    current_price: float | None = None
+    net_position: float | None = None
+    price_history: dict = {}
+    price_updated_at: str | None = None
 
 class ResponseModel(BaseModel):
     message: str
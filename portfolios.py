@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from methods import get_store_version
+from utils import cache
+from valuation import transactions_to_arrays
+
+# Colonnes de l'agrégat d'un portefeuille : toutes additives, pour pouvoir combiner les partitions
+AGGREGATE_COLUMNS = ["net_quantity", "bought_quantity", "buy_cost", "sold_quantity", "sell_revenue", "transactions"]
+
+
+def compute_portfolio_aggregate(item_dict):
+    """
+    Calcule l'agrégat par ISIN des transactions d'un portefeuille (une seule passe vectorisée sur sa partition).
+
+    Args:
+        item_dict (dict): Dictionnaire {id: StockEntry} des transactions du portefeuille.
+
+    Returns:
+        pd.DataFrame: Agrégat indexé par ISIN avec les colonnes AGGREGATE_COLUMNS.
+    """
+    if not item_dict:
+        return pd.DataFrame(columns=AGGREGATE_COLUMNS, dtype=float).rename_axis("isin")
+    dates, isins, quantities, unit_prices = transactions_to_arrays(item_dict)
+    buys = quantities > 0
+    amounts = np.abs(quantities) * unit_prices
+    df = pd.DataFrame({
+        "isin": isins.astype(str),
+        "net_quantity": quantities,
+        "bought_quantity": np.where(buys, quantities, 0.0),
+        "buy_cost": np.where(buys, amounts, 0.0),
+        "sold_quantity": np.where(buys, 0.0, -quantities),
+        "sell_revenue": np.where(buys, 0.0, amounts),
+        "transactions": 1,
+    })
+    return df.groupby("isin")[AGGREGATE_COLUMNS].sum()
+
+
+def get_portfolio_aggregate(portfolio, item_dict):
+    """
+    Retourne l'agrégat d'un portefeuille, mis en cache par version de sa partition.
+
+    Args:
+        portfolio (str): Le nom du portefeuille.
+        item_dict (dict): Dictionnaire {id: StockEntry} des transactions du portefeuille.
+
+    Returns:
+        pd.DataFrame: L'agrégat par ISIN du portefeuille.
+    """
+    key = ("portfolio_aggregate", portfolio)
+    version = get_store_version(portfolio)
+    cached = cache.get_cache(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    aggregate = compute_portfolio_aggregate(item_dict)
+    cache.set_cache(key, (version, aggregate))
+    return aggregate
+
+
+def combine_aggregates(aggregates):
+    """
+    Combine les agrégats de plusieurs portefeuilles (somme par ISIN), sans relire les transactions.
+
+    Args:
+        aggregates (list[pd.DataFrame]): Les agrégats par ISIN des portefeuilles.
+
+    Returns:
+        pd.DataFrame: L'agrégat combiné par ISIN.
+    """
+    aggregates = [aggregate for aggregate in aggregates if not aggregate.empty]
+    if not aggregates:
+        return pd.DataFrame(columns=AGGREGATE_COLUMNS, dtype=float).rename_axis("isin")
+    return pd.concat(aggregates).groupby(level=0).sum()
+
+
+def get_cross_portfolio_aggregate(portfolios):
+    """
+    Calcule en parallèle l'agrégat de chaque partition, puis les combine.
+
+    Args:
+        portfolios (dict): Dictionnaire {portefeuille: {id: StockEntry}}.
+
+    Returns:
+        pd.DataFrame: L'agrégat combiné par ISIN de tous les portefeuilles donnés.
+    """
+    with ThreadPoolExecutor() as executor:
+        aggregates = list(executor.map(get_portfolio_aggregate, portfolios.keys(), portfolios.values()))
+    return combine_aggregates(aggregates)
+
+
+def aggregate_to_dict(aggregate):
+    """
+    Convertit un agrégat en dictionnaire, complété des plus ou moins-values réalisées et des prix moyens d'achat.
+    Comme dans calculate_portfolio_gains, la plus ou moins-value réalisée vaut le montant des ventes moins celui
+    des achats, pour les ISIN à la fois achetés et vendus.
+
+    Args:
+        aggregate (pd.DataFrame): L'agrégat par ISIN.
+
+    Returns:
+        dict: {isin: {colonnes de l'agrégat, realized_gain, average_buy_price}}.
+    """
+    result = {}
+    for isin, row in aggregate.iterrows():
+        traded_both_ways = row["bought_quantity"] > 0 and row["sold_quantity"] > 0
+        result[isin] = {
+            **{column: float(row[column]) for column in AGGREGATE_COLUMNS},
+            "realized_gain": round(float(row["sell_revenue"] - row["buy_cost"]), 2) if traded_both_ways else 0.0,
+            "average_buy_price": float(row["buy_cost"] / row["bought_quantity"]) if row["bought_quantity"] else 0.0,
+        }
+    return result
@@ -0,0 +1,204 @@
+import calendar
+import threading
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from methods import get_store_version
+from utils import cache
+from valuation import apply_transaction, transactions_to_arrays
+
+
+def month_end(date):
+    """
+    Retourne le dernier jour du mois d'une date.
+
+    Args:
+        date (str): Date au format yyyy-mm-dd.
+
+    Returns:
+        str: Le dernier jour du mois, au format yyyy-mm-dd.
+    """
+    year, month = int(date[:4]), int(date[5:7])
+    return f"{date[:7]}-{calendar.monthrange(year, month)[1]:02d}"
+
+
+class PositionSnapshots:
+    """
+    Instantanés matérialisés des positions d'un portefeuille en fin de mois, pour les requêtes à une date passée.
+
+    Chaque instantané donne, pour chaque ISIN, la quantité, le coût de revient et la plus ou moins-value
+    réalisée après la dernière transaction du mois. Une requête à la date D cherche par dichotomie le dernier
+    instantané antérieur ou égal à D et ne rejoue que les transactions postérieures. Une modification datée
+    invalide uniquement les instantanés postérieurs à sa date, reconstruits à partir du dernier instantané conservé.
+    """
+
+    def __init__(self):
+        self.version = None
+        # transactions triées par date : dates (yyyy-mm-dd), isins, quantités signées et prix unitaires
+        self.dates = []
+        self.isins = []
+        self.quantities = []
+        self.unit_prices = []
+        # instantanés triés : dates de fin de mois et états {isin: (quantité, coût de revient, plus-value réalisée)}
+        self.snapshot_dates = []
+        self.snapshots = []
+        self._invalid_from = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, date):
+        """
+        Signale une modification datée de l'inventaire (ajout, modification ou suppression d'une transaction) :
+        les instantanés de fin de mois postérieurs ou égaux à cette date seront reconstruits à la prochaine synchronisation.
+
+        Args:
+            date (str): Date de la transaction modifiée (yyyy-mm-dd).
+        """
+        if self._invalid_from is None or date < self._invalid_from:
+            self._invalid_from = date
+
+    def _load_transactions(self, item_dict):
+        """
+        Recharge les transactions triées par date (ordre des identifiants à date égale).
+
+        Args:
+            item_dict (dict): Dictionnaire {id: StockEntry} des transactions.
+        """
+        if not item_dict:
+            self.dates, self.isins, self.quantities, self.unit_prices = [], [], [], []
+            return
+        dates, isins, quantities, unit_prices = transactions_to_arrays(item_dict)
+        order = np.argsort(dates, kind="stable")
+        self.dates = np.datetime_as_string(dates[order], unit="D").tolist()
+        self.isins = isins[order].tolist()
+        self.quantities = quantities[order].tolist()
+        self.unit_prices = unit_prices[order].tolist()
+
+    def _replay(self, state, start, stop):
+        """
+        Rejoue les transactions [start, stop) sur une copie d'un état.
+
+        Args:
+            state (dict): État de départ {isin: (quantité, coût de revient, plus-value réalisée)}.
+            start (int): Indice de la première transaction rejouée.
+            stop (int): Indice de fin (exclu).
+
+        Returns:
+            dict: Le nouvel état.
+        """
+        state = dict(state)
+        for position in range(start, stop):
+            isin = self.isins[position]
+            state[isin] = apply_transaction(state.get(isin, (0.0, 0.0, 0.0)),
+                                            self.quantities[position], self.unit_prices[position])
+        return state
+
+    def _rebuild_from(self, kept):
+        """
+        Reconstruit les instantanés qui suivent les `kept` premiers, en repartant du dernier instantané conservé.
+
+        Args:
+            kept (int): Nombre d'instantanés conservés.
+        """
+        del self.snapshot_dates[kept:], self.snapshots[kept:]
+        state = self.snapshots[-1] if self.snapshots else {}
+        start = bisect_right(self.dates, self.snapshot_dates[-1]) if self.snapshot_dates else 0
+        while start < len(self.dates):
+            # dernière transaction du mois de la transaction courante
+            snapshot_date = month_end(self.dates[start])
+            stop = bisect_right(self.dates, snapshot_date, lo=start)
+            state = self._replay(state, start, stop)
+            self.snapshot_dates.append(snapshot_date)
+            self.snapshots.append(state)
+            start = stop
+
+    def sync(self, item_dict, version):
+        """
+        Met à jour les transactions et les instantanés si l'inventaire a changé depuis la dernière synchronisation.
+        Sans invalidation datée, tous les instantanés sont reconstruits.
+
+        Args:
+            item_dict (dict): Dictionnaire {id: StockEntry} des transactions.
+            version (int): Version courante de l'inventaire.
+        """
+        with self._lock:
+            if version == self.version:
+                return
+            self._load_transactions(item_dict)
+            kept = 0 if self._invalid_from is None else bisect_left(self.snapshot_dates, self._invalid_from)
+            self._rebuild_from(kept)
+            self._invalid_from = None
+            self.version = version
+
+    def as_of(self, date):
+        """
+        Calcule l'état des positions à une date : dernier instantané antérieur ou égal à la date,
+        complété des seules transactions postérieures à cet instantané.
+
+        Args:
+            date (str): Date de la requête (yyyy-mm-dd), transactions du jour incluses.
+
+        Returns:
+            dict: {isin: (quantité, coût de revient, plus ou moins-value réalisée)}.
+        """
+        with self._lock:
+            position = bisect_right(self.snapshot_dates, date) - 1
+            if position >= 0:
+                state, start = self.snapshots[position], bisect_right(self.dates, self.snapshot_dates[position])
+            else:
+                state, start = {}, 0
+            return self._replay(state, start, bisect_right(self.dates, date, lo=start))
+
+
+def get_position_snapshots(portfolio, item_dict):
+    """
+    Retourne les instantanés de positions d'un portefeuille, synchronisés avec la version de sa partition.
+
+    Args:
+        portfolio (str): Le nom du portefeuille.
+        item_dict (dict): Dictionnaire {id: StockEntry} des transactions du portefeuille.
+
+    Returns:
+        PositionSnapshots: Les instantanés du portefeuille.
+    """
+    key = ("position_snapshots", portfolio)
+    snapshots = cache.get_cache(key)
+    if snapshots is None:
+        snapshots = PositionSnapshots()
+        cache.set_cache(key, snapshots)
+    snapshots.sync(item_dict, get_store_version(portfolio))
+    return snapshots
+
+
+def invalidate_position_snapshots(portfolio, *dates):
+    """
+    Invalide les instantanés d'un portefeuille à partir de la plus ancienne des dates modifiées.
+    À appeler à chaque ajout, modification ou suppression de transaction, avec la ou les dates concernées.
+
+    Args:
+        portfolio (str): Le nom du portefeuille.
+        *dates (str): Dates des transactions modifiées (yyyy-mm-dd).
+    """
+    snapshots = cache.get_cache(("position_snapshots", portfolio))
+    if snapshots is not None:
+        snapshots.invalidate(min(dates))
+
+
+def get_positions_as_of(portfolio, item_dict, date):
+    """
+    Retourne les positions d'un portefeuille à une date passée.
+
+    Args:
+        portfolio (str): Le nom du portefeuille.
+        item_dict (dict): Dictionnaire {id: StockEntry} des transactions du portefeuille.
+        date (str): Date de la requête (yyyy-mm-dd).
+
+    Returns:
+        dict: {isin: {quantity, cost_basis, average_cost, realized_pnl}}.
+    """
+    state = get_position_snapshots(portfolio, item_dict).as_of(date)
+    return {isin: {"quantity": quantity,
+                   "cost_basis": round(cost_basis, 2),
+                   "average_cost": cost_basis / quantity if quantity else 0.0,
+                   "realized_pnl": round(realized_pnl, 2)}
+            for isin, (quantity, cost_basis, realized_pnl) in state.items()}
@@ -0,0 +1,259 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+import yfinance as yf
+
+from config import *
+from methods import get_store_version
+from valuation import transactions_to_arrays
+
+
+@dataclass
+class PriceQuote:
+    """
+    Dernier prix connu d'un actif, conservé dans l'instantané du rafraîchisseur.
+
+    Attributes:
+        ticker (str): Le symbole boursier de l'actif.
+        current_price (float): Dernier prix de clôture connu.
+        returns_history (pd.Series): Historique des prix ajustés (Adj Close).
+        updated_at (datetime): Date et heure de la récupération du prix (fraîcheur de la donnée).
+    """
+    ticker: str
+    current_price: float
+    returns_history: pd.Series
+    updated_at: datetime
+
+
+class PriceRefresher:
+    """
+    Tâche de fond asyncio qui maintient un instantané des prix de tous les ISIN détenus.
+
+    Les requêtes lisent toujours l'instantané (valeur éventuellement périmée accompagnée de sa date
+    de récupération) au lieu d'attendre Yahoo Finance. Les tickers sont rafraîchis par lots à intervalle
+    régulier, dans la limite d'un nombre d'appels par minute, en commençant par les plus récemment consultés.
+    Les tickers demandés par une page et absents de l'instantané sont mis en file (cf. request) : ils passent
+    en tête du cycle suivant, déclenché sans attendre la fin de l'intervalle.
+    """
+
+    def __init__(self, item_source, interval=PRICE_REFRESH_INTERVAL, batch_size=PRICE_REFRESH_BATCH_SIZE,
+                 calls_per_minute=PRICE_REFRESH_CALLS_PER_MINUTE, history_period=PRICE_HISTORY_PERIOD,
+                 refresh_period=PRICE_REFRESH_PERIOD):
+        """
+        Args:
+            item_source (Callable[[], dict]): Fonction retournant le dictionnaire {id: StockEntry} courant.
+            interval (float): Intervalle en secondes entre deux cycles de rafraîchissement.
+            batch_size (int): Nombre de tickers téléchargés par appel à Yahoo Finance.
+            calls_per_minute (int): Nombre maximal d'appels à Yahoo Finance sur une minute glissante.
+            history_period (str): Profondeur de l'historique téléchargé au premier chargement d'un ticker
+                (paramètre period de yf.download).
+            refresh_period (str): Fenêtre récente téléchargée pour un ticker déjà chargé, fusionnée dans son historique.
+        """
+        self.item_source = item_source
+        self.interval = interval
+        self.batch_size = batch_size
+        self.calls_per_minute = calls_per_minute
+        self.history_period = history_period
+        self.refresh_period = refresh_period
+        self.snapshot = {}
+        # incrémentée à chaque mise-à-jour de l'instantané
+        self.version = 0
+        self.last_viewed = {}
+        self.held_tickers = []
+        self._held_version = None
+        self._calls = deque()
+        # tickers demandés et absents de l'instantané, dans l'ordre des demandes
+        self._requested = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+
+    def get_quote(self, ticker):
+        """
+        Lit le prix d'un ticker dans l'instantané et le marque comme récemment consulté.
+
+        Args:
+            ticker (str): Le symbole boursier.
+
+        Returns:
+            PriceQuote | None: Le dernier prix connu, ou None si le ticker n'a jamais été récupéré.
+        """
+        self.last_viewed[ticker] = time.monotonic()
+        return self.snapshot.get(ticker)
+
+    def request(self, tickers):
+        """
+        Met en file, en priorité, les tickers absents de l'instantané et réveille la tâche de fond (appel non bloquant,
+        utilisable depuis n'importe quel thread). Un ticker déjà en file n'est pas demandé une seconde fois.
+
+        Args:
+            tickers (list[str]): Les tickers dont le prix est demandé.
+        """
+        with self._lock:
+            missing = [ticker for ticker in tickers if ticker not in self.snapshot and ticker not in self._requested]
+            self._requested.update(dict.fromkeys(missing))
+        if missing and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # boucle fermée : la tâche de fond est arrêtée
+                pass
+
+    def refresh_held_tickers(self):
+        """
+        Recalcule la liste des ISIN détenus si l'inventaire a changé : réunion des ISIN de quantité nette non nulle
+        dans au moins un portefeuille (une position longue dans un portefeuille et courte dans un autre reste détenue).
+
+        Returns:
+            list[str]: Les ISIN détenus.
+        """
+        version = get_store_version()
+        if version != self._held_version:
+            item_dict = self.item_source()
+            if item_dict:
+                dates, isins, quantities, unit_prices = transactions_to_arrays(item_dict)
+                portfolios = [entry.portfolio for entry in item_dict.values()]
+                net_quantities = pd.Series(quantities).groupby([portfolios, isins.astype(str)]).sum()
+                held = net_quantities[net_quantities != 0].index.get_level_values(1)
+                self.held_tickers = sorted(set(held))
+            else:
+                self.held_tickers = []
+            self._held_version = version
+        return self.held_tickers
+
+    def _remaining_budget(self):
+        """
+        Nombre d'appels à Yahoo Finance encore autorisés sur la minute glissante.
+
+        Returns:
+            int: Le nombre d'appels disponibles.
+        """
+        with self._lock:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0] >= 60:
+                self._calls.popleft()
+            return self.calls_per_minute - len(self._calls)
+
+    def _prioritized_tickers(self):
+        """
+        Ordonne les tickers à rafraîchir : ceux demandés par une page et absents de l'instantané d'abord,
+        puis les tickers détenus, les plus récemment consultés d'abord, puis les prix les plus anciens.
+
+        Returns:
+            list[str]: Les tickers dans l'ordre de rafraîchissement.
+        """
+        def priority(ticker):
+            quote = self.snapshot.get(ticker)
+            updated_at = quote.updated_at.timestamp() if quote else 0.0
+            return -self.last_viewed.get(ticker, 0.0), updated_at
+        with self._lock:
+            requested = [ticker for ticker in self._requested if ticker not in self.snapshot]
+        return list(dict.fromkeys(requested + sorted(self.refresh_held_tickers(), key=priority)))
+
+    def _batches(self, tickers):
+        """
+        Découpe des tickers en lots : ceux jamais chargés (historique complet) d'abord, puis les autres (fenêtre récente),
+        afin qu'un ticker inconnu n'impose pas le téléchargement de l'historique complet à tout son lot.
+
+        Args:
+            tickers (list[str]): Les tickers, dans l'ordre de priorité.
+
+        Returns:
+            list[list[str]]: Les lots à télécharger, dans l'ordre.
+        """
+        cold = [ticker for ticker in tickers if ticker not in self.snapshot]
+        warm = [ticker for ticker in tickers if ticker in self.snapshot]
+        return [group[start:start + self.batch_size]
+                for group in (cold, warm) for start in range(0, len(group), self.batch_size)]
+
+    def fetch(self, tickers):
+        """
+        Télécharge en un seul appel les prix de clôture et l'historique ajusté d'un lot de tickers
+        et met à jour l'instantané (appel bloquant). Pour un lot de tickers déjà chargés, seule la fenêtre récente
+        est téléchargée et fusionnée dans l'historique conservé.
+
+        Args:
+            tickers (list[str]): Les tickers du lot.
+        """
+        with self._lock:
+            self._calls.append(time.monotonic())
+        known = all(ticker in self.snapshot for ticker in tickers)
+        period = self.refresh_period if known else self.history_period
+        df = yf.download(list(tickers), period=period, progress=False)
+        close, adj_close = df['Close'], df['Adj Close']
+        # yfinance renvoie des Series lorsqu'un seul ticker est demandé
+        if isinstance(close, pd.Series):
+            close, adj_close = close.to_frame(tickers[0]), adj_close.to_frame(tickers[0])
+
+        updated_at = datetime.now()
+        for ticker in tickers:
+            if ticker not in close.columns:
+                continue
+            prices = close[ticker].dropna()
+            if prices.empty:
+                continue
+            history = adj_close[ticker].dropna()
+            previous = self.snapshot.get(ticker)
+            if previous is not None:
+                # fusion de la fenêtre récente dans l'historique conservé (les nouvelles valeurs l'emportent)
+                history = history.combine_first(previous.returns_history)
+            self.snapshot[ticker] = PriceQuote(ticker=ticker,
+                                               current_price=float(prices.iloc[-1]),
+                                               returns_history=history,
+                                               updated_at=updated_at)
+        self.version += 1
+
+    async def refresh_once(self):
+        """
+        Effectue un cycle de rafraîchissement : les lots sont téléchargés par ordre de priorité
+        tant que le budget d'appels le permet, les tickers restants seront traités au cycle suivant.
+        """
+        for batch in self._batches(self._prioritized_tickers()):
+            if self._remaining_budget() <= 0:
+                break
+            try:
+                await asyncio.to_thread(self.fetch, batch)
+            except Exception:
+                # un échec de Yahoo Finance ne doit pas arrêter le rafraîchissement : on garde les valeurs périmées
+                continue
+            finally:
+                # retirés de la file après le téléchargement, pour qu'une demande concurrente ne le relance pas ;
+                # un ticker demandé qui reste introuvable n'est plus prioritaire (il reste rafraîchi s'il est détenu)
+                with self._lock:
+                    for ticker in batch:
+                        self._requested.pop(ticker, None)
+
+    async def run(self):
+        """Boucle de rafraîchissement exécutée jusqu'à l'annulation de la tâche."""
+        while True:
+            self._wakeup.clear()
+            await self.refresh_once()
+            try:
+                # attente de l'intervalle, écourtée par une demande de prix manquant (cf. request)
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Démarre la tâche de fond sur la boucle d'événements courante."""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Arrête la tâche de fond."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
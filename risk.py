@@ -0,0 +1,268 @@
+import threading
+from datetime import datetime, timedelta
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from config import RISK_ENGINE_CHECK_INTERVAL
+from data_manager import *
+from utils import cache
+from valuation import transactions_to_arrays
+
+# Nombre de jours de cotation par an (annualisation de la volatilité)
+TRADING_DAYS = 252
+
+# Verrous des moteurs en cache, par clé : un moteur n'est mis à jour et lu que par une requête à la fois
+_engine_locks = {}
+
+
+class RiskEngine:
+    """
+    Moteur de calcul de risque sur une fenêtre glissante de rendements journaliers (jours x tickers).
+
+    Les sommes nécessaires à la covariance (nombre de jours, somme des rendements et produit X'X)
+    sont conservées : l'arrivée d'un nouveau jour de cotation ne coûte qu'une mise-à-jour de rang 1,
+    et la sortie de la fenêtre du jour le plus ancien une réduction de rang 1, au lieu d'un recalcul complet.
+    """
+
+    def __init__(self, prices: pd.DataFrame):
+        """
+        Initialise le moteur à partir de l'historique des prix ajustés ; le premier jour sert de prix de référence.
+
+        Args:
+            prices (pd.DataFrame): Prix ajustés indexés par date, une colonne par ticker.
+        """
+        self.tickers = list(prices.columns)
+        self.prices = prices.iloc[:0]
+        self.last_date = None
+        self.reference_date = None
+        self.last_prices = np.full(len(self.tickers), np.nan)
+        self.return_dates = prices.index[:0]
+        self.returns = np.empty((0, len(self.tickers)))
+        self.sum_returns = np.zeros(len(self.tickers))
+        self.cross_product = np.zeros((len(self.tickers), len(self.tickers)))
+        self.updates_since_check = 0
+        self._append(prices)
+
+    def _append(self, prices: pd.DataFrame):
+        """
+        Ajoute les rendements correspondant à de nouvelles lignes de prix (mise-à-jour de rang 1 par jour).
+
+        Args:
+            prices (pd.DataFrame): Prix ajustés postérieurs au dernier jour connu, colonnes alignées sur self.tickers.
+        """
+        if not len(prices.index):
+            return
+        self.prices = pd.concat([self.prices, prices]) if len(self.prices.index) else prices
+        dates = prices.index
+        matrix = prices.to_numpy(dtype=float)
+        if self.last_date is None:
+            # premier jour : prix de référence, sans rendement
+            self.last_prices, matrix, dates = matrix[0], matrix[1:], dates[1:]
+            self.reference_date = prices.index[0]
+
+        # Prix propagés sur les jours sans cotation, à partir des derniers prix connus
+        matrix = pd.DataFrame(np.vstack([self.last_prices, matrix])).ffill().to_numpy()
+        previous, current = matrix[:-1], matrix[1:]
+
+        # Rendements journaliers (nuls quand le prix de la veille est inconnu)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            new_returns = np.where(previous > 0, current / previous - 1, 0.0)
+        new_returns = np.nan_to_num(new_returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+        self.return_dates = self.return_dates.append(dates)
+        self.returns = np.vstack([self.returns, new_returns])
+        self.sum_returns += new_returns.sum(axis=0)
+        self.cross_product += new_returns.T @ new_returns
+        self.last_prices = matrix[-1]
+        self.last_date = prices.index[-1]
+
+    def _trim(self, start_date):
+        """
+        Retire de la fenêtre les jours antérieurs à start_date (réduction de rang 1 par jour retiré), de sorte que
+        le moteur corresponde à un moteur reconstruit sur les prix à partir de start_date : le premier jour coté
+        à partir de cette date devient le prix de référence.
+
+        Args:
+            start_date (str): Date de début de la fenêtre (yyyy-mm-dd).
+        """
+        start = pd.Timestamp(start_date)
+        if not len(self.return_dates) or self.reference_date >= start:
+            return
+        self.prices = self.prices[self.prices.index >= start]
+        # rendements retirés : ceux datés jusqu'au premier jour coté à partir de start_date, qui devient la référence
+        dropped = min(int(self.return_dates.searchsorted(start, side="left")) + 1, len(self.return_dates))
+        self.reference_date = self.return_dates[dropped - 1]
+        removed = self.returns[:dropped]
+        self.sum_returns -= removed.sum(axis=0)
+        self.cross_product -= removed.T @ removed
+        self.returns = self.returns[dropped:]
+        self.return_dates = self.return_dates[dropped:]
+
+    def update(self, prices: pd.DataFrame, start_date=None):
+        """
+        Fait glisser la fenêtre : ajoute les jours postérieurs au dernier jour connu et retire ceux antérieurs à start_date.
+
+        Args:
+            prices (pd.DataFrame): Prix ajustés récents (seules les dates postérieures à last_date sont intégrées).
+            start_date (str, optional): Nouvelle date de début de la fenêtre (yyyy-mm-dd).
+
+        Returns:
+            RiskEngine: Le moteur mis à jour.
+        """
+        prices = prices.reindex(columns=self.tickers)
+        if self.last_date is not None:
+            prices = prices[prices.index > self.last_date]
+        if len(prices.index):
+            self._append(prices)
+            self.updates_since_check += 1
+        if start_date is not None:
+            self._trim(start_date)
+        return self
+
+    def is_consistent(self, tolerance: float = 1e-9):
+        """
+        Vérifie que l'état incrémental correspond à un moteur reconstruit entièrement sur la même fenêtre de prix
+        (mêmes jours, mêmes rendements, et sommes conservées sans dérive numérique des mises-à-jour successives).
+
+        Args:
+            tolerance (float): Écart absolu toléré.
+
+        Returns:
+            bool: True si le moteur est identique au recalcul complet.
+        """
+        rebuilt = RiskEngine(self.prices)
+        return (rebuilt.return_dates.equals(self.return_dates)
+                and np.allclose(rebuilt.returns, self.returns, rtol=0, atol=tolerance)
+                and np.allclose(rebuilt.sum_returns, self.sum_returns, rtol=0, atol=tolerance)
+                and np.allclose(rebuilt.cross_product, self.cross_product, rtol=0, atol=tolerance))
+
+    def covariance(self):
+        """
+        Calcule la matrice de covariance des rendements journaliers à partir des sommes conservées.
+
+        Returns:
+            np.ndarray: La matrice de covariance (tickers x tickers).
+        """
+        n = self.returns.shape[0]
+        if n < 2:
+            return np.zeros_like(self.cross_product)
+        mean = self.sum_returns / n
+        return (self.cross_product - n * np.outer(mean, mean)) / (n - 1)
+
+    def compute(self, quantities: np.ndarray, confidence: float = 0.95, include_matrices: bool = False):
+        """
+        Calcule les indicateurs de risque du portefeuille.
+
+        Args:
+            quantities (np.ndarray): Quantités détenues, alignées sur self.tickers.
+            confidence (float): Niveau de confiance de la VaR et de la CVaR.
+            include_matrices (bool): Si True, inclut les matrices de covariance et de corrélation.
+
+        Returns:
+            dict: Volatilité, VaR / CVaR historiques et paramétriques, drawdown maximal,
+            contributions au risque par ticker (et matrices si demandé).
+        """
+        covariance = self.covariance()
+        values = quantities * np.nan_to_num(self.last_prices)
+        total_value = values.sum()
+        weights = values / total_value if total_value else np.zeros_like(values)
+
+        # Rendements journaliers du portefeuille et volatilité
+        portfolio_returns = self.returns @ weights
+        marginal = covariance @ weights
+        variance = float(weights @ marginal)
+        volatility = float(np.sqrt(max(variance, 0.0)))
+        mean = float(portfolio_returns.mean()) if len(portfolio_returns) else 0.0
+
+        # VaR / CVaR historiques (exprimées en pertes positives)
+        if len(portfolio_returns):
+            threshold = np.quantile(portfolio_returns, 1 - confidence)
+            historical_var = -threshold
+            historical_cvar = -portfolio_returns[portfolio_returns <= threshold].mean()
+        else:
+            historical_var = historical_cvar = 0.0
+
+        # VaR / CVaR paramétriques (loi normale)
+        z = NormalDist().inv_cdf(confidence)
+        parametric_var = z * volatility - mean
+        parametric_cvar = volatility * NormalDist().pdf(z) / (1 - confidence) - mean
+
+        # Drawdown maximal de la valeur liquidative du portefeuille
+        nav = np.cumprod(1 + portfolio_returns)
+        max_drawdown = float(-(nav / np.maximum.accumulate(nav) - 1).min()) if len(nav) else 0.0
+
+        # Contribution de chaque position à la volatilité (la somme vaut la volatilité)
+        contributions = weights * marginal / volatility if volatility else np.zeros_like(weights)
+
+        result = {
+            "tickers": self.tickers,
+            "observations": int(self.returns.shape[0]),
+            "confidence": confidence,
+            "total_value": float(total_value),
+            "weights": weights,
+            "daily_volatility": volatility,
+            "annual_volatility": volatility * np.sqrt(TRADING_DAYS),
+            "historical_var": float(historical_var),
+            "historical_cvar": float(historical_cvar),
+            "parametric_var": parametric_var,
+            "parametric_cvar": parametric_cvar,
+            "max_drawdown": max_drawdown,
+            "risk_contributions": contributions,
+        }
+        if include_matrices:
+            std = np.sqrt(np.diag(covariance))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                correlation = np.nan_to_num(covariance / np.outer(std, std))
+            result["covariance"] = covariance
+            result["correlation"] = correlation
+        return result
+
+
+def get_portfolio_risk(item_dict, years: int = 5, confidence: float = 0.95, include_matrices: bool = False):
+    """
+    Calcule les indicateurs de risque du portefeuille courant sur un historique de plusieurs années.
+    Le moteur est conservé en cache : seuls les jours postérieurs à son dernier jour connu sont téléchargés,
+    et la fenêtre glisse pour rester égale à la profondeur demandée.
+
+    Args:
+        item_dict (dict): Dictionnaire {id: StockEntry} des transactions.
+        years (int): Profondeur de l'historique en années.
+        confidence (float): Niveau de confiance de la VaR et de la CVaR.
+        include_matrices (bool): Si True, inclut les matrices de covariance et de corrélation.
+
+    Returns:
+        dict: Les indicateurs calculés par RiskEngine.compute.
+    """
+    if not item_dict:
+        return {"tickers": [], "observations": 0}
+
+    dates, isins, quantities, unit_prices = transactions_to_arrays(item_dict)
+    tickers, positions = np.unique(isins.astype(str), return_inverse=True)
+    net_quantities = np.bincount(positions, weights=quantities, minlength=len(tickers))
+
+    today = datetime.now()
+    end_date = today.strftime("%Y-%m-%d")
+    start_date = (today - timedelta(days=365 * years)).strftime("%Y-%m-%d")
+
+    key = ("risk_engine", tuple(tickers), years)
+    # deux requêtes simultanées intégreraient deux fois le même jour : téléchargement, mise-à-jour et calcul sous verrou
+    with _engine_locks.setdefault(key, threading.Lock()):
+        engine = cache.get_cache(key)
+        if engine is None or engine.last_date is None:
+            engine = RiskEngine(YahooFinanceDataLoader.download_adj_close(list(tickers), start_date, end_date))
+        else:
+            # Téléchargement des seuls jours postérieurs au dernier jour intégré au moteur
+            fetch_start = (engine.last_date + timedelta(days=1)).strftime("%Y-%m-%d")
+            new_prices = YahooFinanceDataLoader.download_adj_close(list(tickers), fetch_start, end_date) \
+                if fetch_start < end_date else None
+            engine.update(new_prices if new_prices is not None else engine.prices.iloc[:0], start_date)
+
+            # Vérification périodique contre un recalcul complet sur la même fenêtre (dérive numérique des réductions)
+            if engine.updates_since_check >= RISK_ENGINE_CHECK_INTERVAL:
+                engine = engine if engine.is_consistent() else RiskEngine(engine.prices)
+                engine.updates_since_check = 0
+        cache.set_cache(key, engine)
+
+        return engine.compute(net_quantities, confidence, include_matrices)
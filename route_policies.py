@@ -0,0 +1,507 @@
+import asyncio
+import functools
+import inspect
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+import orjson
+from fastapi import Body, HTTPException
+from pydantic import ValidationError, create_model
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from config import BATCH_CONCURRENCY, BATCH_MAX_SIZE, PROCESS_POOL_WORKERS, THREAD_POOL_WORKERS
+from methods import get_store_version
+from serialization import RawJSONResponse
+from utils import RateLimiter, cache
+
+# Nom du paramètre ajouté à la signature d'une route qui ne reçoit pas déjà la requête
+POLICY_REQUEST_PARAMETER = "_policy_request"
+
+# Temps d'exécution mesurés pour chaque route décorée, indexés par "MÉTHODE chemin"
+route_metrics = {}
+
+# Exécuteurs disponibles : boucle d'événements, pool de threads dédié, pool de processus
+EXECUTORS = ("loop", "thread", "process")
+
+# Pools dédiés aux routes, créés à la première utilisation
+_thread_pool = None
+_process_pool = None
+
+
+def get_thread_pool():
+    """
+    Retourne le pool de threads dédié aux routes (distinct du pool par défaut de Starlette).
+
+    Returns:
+        ThreadPoolExecutor: Le pool de THREAD_POOL_WORKERS threads.
+    """
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS, thread_name_prefix="route")
+    return _thread_pool
+
+
+def get_process_pool():
+    """
+    Retourne le pool de processus dédié aux routes gourmandes en calcul.
+    Les processus sont démarrés par « spawn » et non par fork : le serveur a déjà des threads en cours
+    (rafraîchissement des prix, pools de threads) qu'un fork dupliquerait dans un état incohérent.
+
+    Returns:
+        ProcessPoolExecutor: Le pool de PROCESS_POOL_WORKERS processus.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+
+def _discard_process_pool(pool):
+    """
+    Écarte un pool de processus devenu inutilisable (processus mort) : le prochain appel en crée un nouveau.
+
+    Args:
+        pool (ProcessPoolExecutor): Le pool cassé.
+    """
+    global _process_pool
+    if _process_pool is pool:
+        _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_executors():
+    """Arrête les pools de threads et de processus dédiés aux routes."""
+    global _thread_pool, _process_pool
+    for pool in (_thread_pool, _process_pool):
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    _thread_pool = _process_pool = None
+
+
+def _run_coroutine(func, kwargs):
+    """
+    Exécute une fonction asynchrone jusqu'à son terme dans une boucle d'événements propre au thread / processus.
+
+    Args:
+        func (Callable): La fonction asynchrone.
+        kwargs (dict): Ses arguments.
+
+    Returns:
+        Le résultat de la fonction.
+    """
+    return asyncio.run(func(**kwargs))
+
+
+def _run_in_process(func, kwargs):
+    """
+    Point d'entrée d'une fonction de route dans le pool de processus. Une HTTPException ne peut pas être
+    reconstruite par pickle : elle est renvoyée sous la forme (status_code, detail, headers) et relevée
+    dans le processus principal (cf. run_with_executor).
+
+    Args:
+        func (Callable): La fonction (synchrone ou asynchrone).
+        kwargs (dict): Ses arguments.
+
+    Returns:
+        tuple: (résultat, None) ou (None, (status_code, detail, headers)) si la fonction a levé une HTTPException.
+    """
+    try:
+        return (_run_coroutine(func, kwargs) if inspect.iscoroutinefunction(func) else func(**kwargs)), None
+    except HTTPException as exc:
+        return None, (exc.status_code, exc.detail, exc.headers)
+
+
+def _call_soon(loop, callback):
+    """
+    Programme un callback sur la boucle d'événements depuis un autre thread (sans effet si la boucle est fermée).
+
+    Args:
+        loop (asyncio.AbstractEventLoop): La boucle d'événements.
+        callback (Callable): Le callback.
+    """
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass
+
+
+class Completion:
+    """
+    Signale une seule fois la fin réelle de l'exécution d'une fonction de route, y compris lorsque la coroutine
+    qui l'attendait a été annulée (délai dépassé) alors que le travail continue dans un thread ou un processus.
+    """
+
+    def __init__(self, callback=None):
+        """
+        Args:
+            callback (Callable, optional): Fonction appelée sur la boucle d'événements à la fin de l'exécution.
+        """
+        self.callback = callback
+        self.started = False
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def begin(self):
+        """
+        Marque le début de l'exécution.
+
+        Returns:
+            bool: False si l'exécution a été abandonnée avant de commencer (elle ne doit alors pas avoir lieu).
+        """
+        with self._lock:
+            if self.finished:
+                return False
+            self.started = True
+            return True
+
+    def finish(self):
+        """Marque la fin de l'exécution et appelle le callback (une seule fois)."""
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+        if self.callback is not None:
+            self.callback()
+
+    def abandon(self):
+        """Abandonne une exécution qui n'a pas encore commencé : elle est alors considérée comme terminée."""
+        with self._lock:
+            if self.started or self.finished:
+                return
+            self.finished = True
+        if self.callback is not None:
+            self.callback()
+
+    def wrap(self, func, loop):
+        """
+        Enveloppe une fonction synchrone exécutée dans un thread pour signaler sa fin sur la boucle d'événements.
+
+        Args:
+            func (Callable): La fonction synchrone.
+            loop (asyncio.AbstractEventLoop): La boucle d'événements qui reçoit le signal.
+
+        Returns:
+            Callable: La fonction enveloppée.
+        """
+        def run(**kwargs):
+            if not self.begin():
+                raise asyncio.CancelledError()
+            try:
+                return func(**kwargs)
+            finally:
+                _call_soon(loop, self.finish)
+        return run
+
+
+async def run_with_executor(func, kwargs, executor=None, completion=None):
+    """
+    Exécute une fonction de route avec l'exécuteur demandé.
+
+    Args:
+        func (Callable): La fonction (synchrone ou asynchrone).
+        kwargs (dict): Ses arguments.
+        executor (str, optional): "loop" (directement sur la boucle d'événements), "thread" (pool de threads dédié)
+            ou "process" (pool de processus : la fonction et ses arguments sont transmis par pickle, seule la référence
+            de la fonction est envoyée). Par défaut, le comportement de FastAPI : les fonctions asynchrones sur la boucle,
+            les fonctions synchrones dans le pool de threads de Starlette.
+        completion (Completion, optional): Signalée lorsque l'exécution est réellement terminée, même si l'attente
+            de son résultat a été annulée entre-temps.
+
+    Returns:
+        Le résultat de la fonction.
+    """
+    completion = completion or Completion()
+    is_coroutine = inspect.iscoroutinefunction(func)
+    loop = asyncio.get_running_loop()
+    if executor == "loop" or (executor is None and is_coroutine):
+        # exécution sur la boucle : l'annulation interrompt réellement le travail
+        if not completion.begin():
+            raise asyncio.CancelledError()
+        try:
+            return await func(**kwargs) if is_coroutine else func(**kwargs)
+        finally:
+            completion.finish()
+    if executor is None:
+        try:
+            return await run_in_threadpool(completion.wrap(func, loop), **kwargs)
+        except asyncio.CancelledError:
+            # si le thread n'a pas encore démarré, la fonction ne sera pas exécutée
+            completion.abandon()
+            raise
+
+    # pools dédiés : la fin du futur concurrent marque la fin réelle du travail (exécuté ou annulé avant son début)
+    if not completion.begin():
+        raise asyncio.CancelledError()
+    if executor == "thread":
+        pool = get_thread_pool()
+        future = pool.submit(_run_coroutine, func, kwargs) if is_coroutine else pool.submit(functools.partial(func, **kwargs))
+        future.add_done_callback(lambda done: _call_soon(loop, completion.finish))
+        return await asyncio.wrap_future(future)
+
+    pool = get_process_pool()
+    try:
+        future = pool.submit(_run_in_process, func, kwargs)
+    except BrokenProcessPool:
+        completion.finish()
+        _discard_process_pool(pool)
+        raise
+    future.add_done_callback(lambda done: _call_soon(loop, completion.finish))
+    try:
+        result, error = await asyncio.wrap_future(future)
+    except BrokenProcessPool:
+        # un processus est mort : le pool refuse désormais tout travail, il est remplacé au prochain appel
+        _discard_process_pool(pool)
+        raise
+    if error is not None:
+        raise HTTPException(*error)
+    return result
+
+
+def check_executor(func, executor):
+    """
+    Vérifie que l'exécuteur demandé est valide pour la fonction.
+
+    Args:
+        func (Callable): La fonction de la route.
+        executor (str | None): L'exécuteur demandé.
+
+    Raises:
+        ValueError: Si l'exécuteur est inconnu, ou si "process" est demandé pour une fonction
+            qui reçoit la requête (non transmissible à un autre processus).
+    """
+    if executor is not None and executor not in EXECUTORS:
+        raise ValueError(f"exécuteur {executor!r} inconnu, attendu parmi {EXECUTORS}")
+    if executor == "process" and any(p.annotation is Request for p in inspect.signature(func).parameters.values()):
+        raise ValueError(f"{func.__name__} dépend de la requête et ne peut pas être exécutée dans un autre processus")
+
+
+def apply_route_policies(func, path: str, method: str, cache_ttl=None, timeout=None, max_concurrency=None, rate_limit=None,
+                         executor=None):
+    """
+    Enveloppe une fonction avant son enregistrement comme route FastAPI pour lui appliquer des règles de performance.
+    Chaque appel est chronométré dans route_metrics.
+
+    Args:
+        func (Callable): La fonction à exposer (synchrone ou asynchrone).
+        path (str): Le chemin de la route.
+        method (str): La méthode HTTP de la route.
+        cache_ttl (float, optional): Durée de mise en cache de la réponse en secondes. La clé est dérivée du chemin,
+            des paramètres de requête et de la version de l'inventaire (une modification invalide le cache).
+        timeout (float, optional): Durée maximale d'exécution en secondes (504 au-delà).
+        max_concurrency (int, optional): Nombre maximal d'exécutions simultanées (503 au-delà).
+        rate_limit (tuple[int, float], optional): (nombre de requêtes, fenêtre en secondes) autorisé par IP (429 au-delà).
+        executor (str, optional): "loop", "thread" ou "process", cf. run_with_executor.
+
+    Returns:
+        Callable: La fonction asynchrone à enregistrer auprès de FastAPI.
+    """
+    check_executor(func, executor)
+    signature = inspect.signature(func)
+    parameters = list(signature.parameters.values())
+
+    # la requête est nécessaire pour la clé de cache et la limitation de taux : on réutilise celle de la fonction
+    # ou on l'ajoute à la signature vue par FastAPI
+    request_parameter = next((p.name for p in parameters if p.annotation is Request), None)
+    if request_parameter is None:
+        parameters.append(inspect.Parameter(POLICY_REQUEST_PARAMETER, inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+
+    route_name = f"{method.upper()} {path}"
+    metrics = route_metrics.setdefault(route_name, {"count": 0, "errors": 0, "total_time": 0.0, "max_time": 0.0})
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+    rate_limiter = RateLimiter(*rate_limit) if rate_limit else None
+
+    async def call(kwargs, completion):
+        result = run_with_executor(func, kwargs, executor, completion)
+        try:
+            if timeout is None:
+                return await result
+            return await asyncio.wait_for(result, timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"délai d'exécution de {timeout}s dépassé")
+        finally:
+            # exécution annulée avant d'avoir commencé : rien ne la signalera comme terminée
+            completion.abandon()
+
+    @functools.wraps(func)
+    async def wrapper(**kwargs):
+        request = kwargs[request_parameter] if request_parameter else kwargs.pop(POLICY_REQUEST_PARAMETER)
+        start = time.perf_counter()
+        try:
+            client_ip = request.client.host if request.client else None
+            if rate_limiter is not None and rate_limiter.is_rate_limited(client_ip):
+                raise HTTPException(status_code=429, detail="trop de requêtes, veuillez réessayer plus tard")
+
+            key = None
+            if cache_ttl is not None:
+                key = ("route", route_name, request.url.path, tuple(sorted(request.query_params.multi_items())),
+                       get_store_version())
+                cached = cache.get_cache(key)
+                if cached is not None:
+                    return cached
+
+            if semaphore is not None:
+                # délestage : la requête est refusée plutôt que mise en attente
+                if semaphore.locked():
+                    raise HTTPException(status_code=503, detail="serveur saturé, veuillez réessayer plus tard")
+                # la place n'est libérée qu'à la fin réelle du travail, qui peut survivre au délai d'attente (504)
+                await semaphore.acquire()
+                result = await call(kwargs, Completion(semaphore.release))
+            else:
+                result = await call(kwargs, Completion())
+
+            if key is not None and not isinstance(result, StreamingResponse):
+                cache.set_cache(key, result, ttl=cache_ttl)
+            return result
+        except Exception:
+            metrics["errors"] += 1
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            metrics["count"] += 1
+            metrics["total_time"] += duration
+            metrics["max_time"] = max(metrics["max_time"], duration)
+
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    return wrapper
+
+
+def get_route_metrics():
+    """
+    Retourne les temps d'exécution mesurés pour chaque route décorée.
+
+    Returns:
+        dict: {"MÉTHODE chemin": {count, errors, total_time, max_time, average_time}}.
+    """
+    return {
+        route: {**metrics, "average_time": metrics["total_time"] / metrics["count"] if metrics["count"] else 0.0}
+        for route, metrics in route_metrics.items()
+    }
+
+
+def get_batch_path(path: str):
+    """
+    Construit le chemin de la variante /batch d'une route, sans ses paramètres de chemin
+    (ex : /read_stock_data/items/{item_id} -> /read_stock_data/items/batch).
+
+    Args:
+        path (str): Le chemin de la route.
+
+    Returns:
+        str: Le chemin de la route /batch.
+    """
+    segments = [segment for segment in path.split("/") if segment and not segment.startswith("{")]
+    return "/" + "/".join(segments + ["batch"])
+
+
+def _batch_result(result):
+    """
+    Convertit le résultat d'un élément du lot en valeur sérialisable, sans re-décoder les réponses JSON.
+
+    Args:
+        result: Le résultat retourné par la fonction.
+
+    Returns:
+        La valeur à insérer dans la réponse du lot.
+    """
+    if isinstance(result, Response):
+        if result.media_type == "application/json":
+            return orjson.Fragment(result.body)
+        return result.body.decode(result.charset)
+    return result
+
+
+def _batch_error(exc):
+    """
+    Convertit l'erreur d'un élément du lot en entrée de la réponse.
+
+    Args:
+        exc (Exception): L'erreur levée pour cet élément.
+
+    Returns:
+        dict: {"status_code", "detail"} de l'erreur.
+    """
+    if isinstance(exc, HTTPException):
+        return {"status_code": exc.status_code, "detail": exc.detail}
+    if isinstance(exc, ValidationError):
+        return {"status_code": 422, "detail": exc.errors(include_url=False, include_context=False)}
+    return {"status_code": 500, "detail": "Une erreur interne non gérée est survenue."}
+
+
+def build_batch_endpoint(func, batch_handler=None, concurrency=BATCH_CONCURRENCY, max_size=BATCH_MAX_SIZE, executor=None):
+    """
+    Crée la fonction de la variante /batch d'une route : elle reçoit une liste de jeux d'arguments,
+    les valide avec la signature de la fonction et renvoie les résultats dans l'ordre, avec une erreur par élément
+    le cas échéant.
+
+    Args:
+        func (Callable): La fonction exposée par la route.
+        batch_handler (Callable, optional): Implémentation vectorisée recevant la liste des arguments validés (dict)
+            dans son paramètre « arguments » et retournant la liste des résultats (une Exception dans la liste signale une erreur pour cet élément).
+            Par défaut, func est appelée pour chaque élément, en parallèle.
+        concurrency (int): Nombre maximal d'appels simultanés de func.
+        max_size (int): Nombre maximal d'éléments par lot (413 au-delà).
+        executor (str, optional): Exécuteur des appels de func et de batch_handler, cf. run_with_executor.
+
+    Returns:
+        Callable: La fonction asynchrone à enregistrer auprès de FastAPI.
+    """
+    parameters = inspect.signature(func).parameters.values()
+    if any(p.annotation is Request for p in parameters):
+        raise ValueError(f"{func.__name__} dépend de la requête et ne peut pas être exposée en lot")
+
+    # modèle de validation construit à partir de la signature de la fonction
+    arguments_model = create_model(
+        f"{func.__name__}_arguments",
+        **{p.name: (Any if p.annotation is inspect.Parameter.empty else p.annotation,
+                    ... if p.default is inspect.Parameter.empty else p.default)
+           for p in parameters}
+    )
+
+    async def batch_endpoint(arguments: list[dict[str, Any]] = Body(...)):
+        if len(arguments) > max_size:
+            raise HTTPException(status_code=413, detail=f"lot limité à {max_size} éléments")
+
+        # validation de chaque jeu d'arguments : une erreur n'invalide que l'élément concerné
+        results = [None] * len(arguments)
+        valid = []
+        for position, element in enumerate(arguments):
+            try:
+                validated = arguments_model.model_validate(element)
+            except ValidationError as exc:
+                results[position] = _batch_error(exc)
+                continue
+            # arguments validés tels quels (sans model_dump, qui convertirait les modèles pydantic en dict)
+            valid.append((position, {name: getattr(validated, name) for name in arguments_model.model_fields}))
+
+        if batch_handler is not None:
+            outputs = await run_with_executor(batch_handler, {"arguments": [kwargs for position, kwargs in valid]}, executor)
+            if len(outputs) != len(valid):
+                # implémentation vectorisée incohérente : aucun résultat ne peut être attribué avec certitude
+                outputs = [Exception(f"{len(outputs)} résultats pour {len(valid)} éléments")] * len(valid)
+            for (position, kwargs), output in zip(valid, outputs):
+                results[position] = _batch_error(output) if isinstance(output, Exception) else \
+                    {"status_code": 200, "result": _batch_result(output)}
+        else:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def run(position, kwargs):
+                async with semaphore:
+                    try:
+                        result = await run_with_executor(func, kwargs, executor)
+                        results[position] = {"status_code": 200, "result": _batch_result(result)}
+                    except Exception as exc:
+                        results[position] = _batch_error(exc)
+
+            await asyncio.gather(*(run(position, kwargs) for position, kwargs in valid))
+
+        return RawJSONResponse(results)
+
+    batch_endpoint.__name__ = f"{func.__name__}_batch"
+    batch_endpoint.__doc__ = f"Variante par lot de {func.__name__} : une liste de jeux d'arguments, résultats dans l'ordre."
+    return batch_endpoint
@@ -0,0 +1,119 @@
+from typing import Any, Dict, Iterable, List
+
+import orjson
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response
+
+from models import *
+
+# Adaptateurs pydantic-core : la sérialisation des collections se fait en une seule passe en Rust,
+# les Enum (OperationType) sont convertis en leur valeur sans modifier les objets.
+_stock_entry_adapter = TypeAdapter(StockEntry)
+_stock_entry_list_adapter = TypeAdapter(List[StockEntry])
+_stock_entry_dict_adapter = TypeAdapter(Dict[int, StockEntry])
+
+# Options orjson : clés non-str (ids entiers) et types numpy (issus de pandas) acceptés nativement
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    """
+    Fonction de repli appelée par orjson pour les types qu'il ne sait pas sérialiser.
+
+    Args:
+        obj: L'objet à convertir.
+
+    Returns:
+        Une représentation sérialisable de l'objet.
+
+    Raises:
+        TypeError: Si le type de l'objet n'est pas pris en charge.
+    """
+    if isinstance(obj, BaseModel):
+        return orjson.Fragment(obj.model_dump_json())
+    if hasattr(obj, "isoformat"):
+        # pd.Timestamp et autres objets date
+        return obj.isoformat()
+    if hasattr(obj, "item"):
+        # scalaires numpy non gérés par OPT_SERIALIZE_NUMPY
+        return obj.item()
+    raise TypeError(f"Type {type(obj).__name__} non sérialisable en JSON")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Sérialise un contenu en bytes JSON avec orjson.
+
+    Args:
+        content: Le contenu à sérialiser (dict, list, BaseModel, orjson.Fragment...).
+
+    Returns:
+        bytes: Le document JSON encodé en UTF-8.
+    """
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+def encode_stock_entry(item: StockEntry) -> orjson.Fragment:
+    """
+    Encode une entrée de stock en JSON.
+
+    Args:
+        item (StockEntry): L'entrée à encoder.
+
+    Returns:
+        orjson.Fragment: Le JSON pré-encodé, insérable tel quel dans une réponse.
+    """
+    return orjson.Fragment(_stock_entry_adapter.dump_json(item))
+
+
+def encode_stock_entries(items: Iterable[StockEntry]) -> orjson.Fragment:
+    """
+    Encode une collection d'entrées de stock en une liste JSON.
+
+    Args:
+        items (Iterable[StockEntry]): Les entrées à encoder.
+
+    Returns:
+        orjson.Fragment: La liste JSON pré-encodée.
+    """
+    return orjson.Fragment(_stock_entry_list_adapter.dump_json(list(items)))
+
+
+def encode_stock_entry_dict(items: Dict[int, StockEntry]) -> orjson.Fragment:
+    """
+    Encode le dictionnaire {id: StockEntry} en un objet JSON.
+
+    Args:
+        items (Dict[int, StockEntry]): Le dictionnaire des entrées.
+
+    Returns:
+        orjson.Fragment: L'objet JSON pré-encodé.
+    """
+    return orjson.Fragment(_stock_entry_dict_adapter.dump_json(items))
+
+
+def stock_entries_to_records(items: Iterable[StockEntry]) -> List[dict]:
+    """
+    Convertit des entrées de stock en dictionnaires « JSON-compatibles » (operation_type en str),
+    sans modifier les objets d'origine. Utile pour construire un DataFrame à écrire dans le csv.
+
+    Args:
+        items (Iterable[StockEntry]): Les entrées à convertir.
+
+    Returns:
+        List[dict]: Une liste de dictionnaires, un par entrée.
+    """
+    return _stock_entry_list_adapter.dump_python(list(items), mode="json")
+
+
+class RawJSONResponse(Response):
+    """
+    Réponse JSON dont le corps est produit directement en bytes par orjson.
+    Si le contenu est déjà en bytes, il est renvoyé tel quel.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
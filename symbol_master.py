@@ -0,0 +1,114 @@
+import os
+from bisect import bisect_left
+
+import pandas as pd
+
+from config import SYMBOL_MASTER_PATH
+
+
+class SymbolMaster:
+    """
+    Référentiel local des symboles boursiers, indexé en mémoire.
+
+    Une table de hachage (dict) permet la recherche exacte d'un symbole, et deux tableaux triés
+    (symboles et noms en minuscules) permettent la recherche par préfixe par dichotomie.
+    """
+
+    def __init__(self, symbols: dict[str, str]):
+        """
+        Args:
+            symbols (dict[str, str]): Dictionnaire {symbole: nom de l'entreprise}.
+        """
+        self.names = symbols
+        self.sorted_symbols = sorted(symbols)
+        self.sorted_names = sorted((name.lower(), symbol) for symbol, name in symbols.items())
+
+    @staticmethod
+    def load(file_path=SYMBOL_MASTER_PATH):
+        """
+        Charge le référentiel à partir d'un fichier csv contenant les colonnes symbol et name.
+
+        Args:
+            file_path (str): Chemin du fichier de référence.
+
+        Returns:
+            SymbolMaster: Le référentiel chargé (vide si le fichier n'existe pas).
+        """
+        if not os.path.exists(file_path):
+            return SymbolMaster({})
+        df = pd.read_csv(file_path, usecols=["symbol", "name"], dtype=str, keep_default_na=False)
+        return SymbolMaster(dict(zip(df["symbol"].str.upper(), df["name"])))
+
+    def __len__(self):
+        return len(self.names)
+
+    def contains(self, symbol: str):
+        """
+        Indique si un symbole figure dans le référentiel.
+
+        Args:
+            symbol (str): Le symbole boursier.
+
+        Returns:
+            bool: True si le symbole est connu.
+        """
+        return symbol.upper() in self.names
+
+    def get_name(self, symbol: str):
+        """
+        Retourne le nom de l'entreprise associé à un symbole, sans appel réseau.
+
+        Args:
+            symbol (str): Le symbole boursier.
+
+        Returns:
+            str | None: Le nom de l'entreprise, ou None si le symbole est inconnu.
+        """
+        return self.names.get(symbol.upper())
+
+    @staticmethod
+    def _prefix_range(sorted_values, prefix, key=lambda value: value):
+        """
+        Parcourt les éléments d'un tableau trié qui commencent par un préfixe.
+
+        Args:
+            sorted_values (list): Le tableau trié.
+            prefix (str): Le préfixe recherché.
+            key (Callable): Fonction donnant la chaîne comparée pour chaque élément.
+
+        Yields:
+            Les éléments dont la clé commence par le préfixe, dans l'ordre du tableau.
+        """
+        position = bisect_left(sorted_values, prefix, key=key)
+        while position < len(sorted_values) and key(sorted_values[position]).startswith(prefix):
+            yield sorted_values[position]
+            position += 1
+
+    def search(self, prefix: str, limit: int = 10):
+        """
+        Recherche les symboles dont le symbole ou le nom commence par un préfixe (autocomplétion).
+        Les correspondances sur le symbole sont listées avant celles sur le nom.
+
+        Args:
+            prefix (str): Le début du symbole ou du nom saisi.
+            limit (int): Nombre maximal de résultats.
+
+        Returns:
+            list[dict]: Les résultats {"symbol", "name"}.
+        """
+        if not prefix:
+            return []
+        results = {}
+        for symbol in self._prefix_range(self.sorted_symbols, prefix.upper()):
+            if len(results) >= limit:
+                break
+            results[symbol] = self.names[symbol]
+        for name, symbol in self._prefix_range(self.sorted_names, prefix.lower(), key=lambda entry: entry[0]):
+            if len(results) >= limit:
+                break
+            results.setdefault(symbol, self.names[symbol])
+        return [{"symbol": symbol, "name": name} for symbol, name in results.items()]
+
+
+# Instance globale du référentiel, chargée au démarrage
+symbol_master = SymbolMaster.load()
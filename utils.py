@@ -1,4 +1,6 @@
 from datetime import datetime, timedelta
+from collections import deque
+import time
 import pandas as pd
 from fastapi.responses import JSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -42,21 +44,49 @@ class SimpleCache:
 
     Cette classe utilise un dictionnaire pour stocker des données en cache.
     Elle offre des méthodes pour définir, obtenir, et effacer des données en cache.
+    Les valeurs expirées sont supprimées à leur lecture, et balayées lors des écritures
+    dès que la plus proche expiration est passée (clés qui ne seront plus jamais lues).
     """
 
     def __init__(self):
         """Initialise le cache comme un dictionnaire vide."""
         self.cache = {}
+        self.expirations = {}
+        # instant de la plus proche expiration, à partir duquel un balayage est utile
+        self._next_sweep = float("inf")
 
-    def set_cache(self, key, value):
+    def _sweep_expired(self, now):
+        """
+        Supprime toutes les valeurs expirées, au plus une fois par expiration.
+
+        Args:
+            now (float): L'instant courant (time.monotonic).
+        """
+        if now < self._next_sweep:
+            return
+        # copies des éléments : le cache peut être modifié en parallèle par d'autres threads
+        for key, expiration in list(self.expirations.items()):
+            if expiration <= now:
+                self.clear_cache(key)
+        self._next_sweep = min(list(self.expirations.values()), default=float("inf"))
+
+    def set_cache(self, key, value, ttl=None):
         """
         Stocke une valeur dans le cache.
 
         Args:
             key: La clé sous laquelle stocker la valeur.
             value: La valeur à stocker dans le cache.
+            ttl (float, optional): Durée de validité en secondes. Par défaut, la valeur n'expire pas.
         """
+        now = time.monotonic()
+        self._sweep_expired(now)
         self.cache[key] = value
+        if ttl is not None:
+            self.expirations[key] = now + ttl
+            self._next_sweep = min(self._next_sweep, now + ttl)
+        else:
+            self.expirations.pop(key, None)
 
     def get_cache(self, key):
         """
@@ -66,8 +96,10 @@ class SimpleCache:
             key: La clé de la valeur à récupérer.
 
         Returns:
-            La valeur stockée dans le cache pour la clé donnée, ou None si la clé n'existe pas.
+            La valeur stockée dans le cache pour la clé donnée, ou None si la clé n'existe pas ou a expiré.
         """
+        if key in self.expirations and self.expirations[key] <= time.monotonic():
+            self.clear_cache(key)
         return self.cache.get(key)
 
     def clear_cache(self, key):
@@ -79,14 +111,68 @@ class SimpleCache:
 
         Cette méthode ne fait rien si la clé n'existe pas dans le cache.
         """
-        if key in self.cache:
-            del self.cache[key]
+        self.cache.pop(key, None)
+        self.expirations.pop(key, None)
 
 
 # Instance globale de SimpleCache
 cache = SimpleCache()
 
 
+class RateLimiter:
+    """
+    Limiteur de taux en mémoire sur une fenêtre glissante, par adresse IP cliente.
+
+    Contrairement à is_rate_limited, il ne relit pas le fichier de logs à chaque requête.
+    """
+
+    def __init__(self, max_requests, time_window):
+        """
+        Args:
+            max_requests (int): Nombre maximal de requêtes autorisées dans la fenêtre.
+            time_window (float): Durée de la fenêtre glissante en secondes.
+        """
+        self.max_requests = max_requests
+        self.time_window = time_window
+        self.requests = {}
+        self._last_sweep = time.monotonic()
+
+    def _evict_idle(self, now):
+        """
+        Supprime les IP sans requête dans la fenêtre, au plus une fois par fenêtre, pour que le dictionnaire
+        ne grossisse pas indéfiniment.
+
+        Args:
+            now (float): L'instant courant (time.monotonic).
+        """
+        if now - self._last_sweep < self.time_window:
+            return
+        self._last_sweep = now
+        for client_ip in [ip for ip, timestamps in self.requests.items()
+                          if not timestamps or now - timestamps[-1] >= self.time_window]:
+            del self.requests[client_ip]
+
+    def is_rate_limited(self, client_ip):
+        """
+        Enregistre une requête du client et indique si elle dépasse la limite.
+
+        Args:
+            client_ip (str): Adresse IP du client.
+
+        Returns:
+            bool: True si le client a dépassé la limite, False sinon.
+        """
+        now = time.monotonic()
+        self._evict_idle(now)
+        timestamps = self.requests.setdefault(client_ip, deque())
+        while timestamps and now - timestamps[0] >= self.time_window:
+            timestamps.popleft()
+        if len(timestamps) >= self.max_requests:
+            return True
+        timestamps.append(now)
+        return False
+
+
 async def http_exception_handler(request, exc):
     """
     Gestionnaire d'exception pour les erreurs HTTP.
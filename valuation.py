@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from config import DEFAULT_PORTFOLIO
+from data_manager import *
+from methods import get_store_version
+from models import *
+from utils import cache
+
+# Types d'opérations qui diminuent la quantité détenue
+SELL_OPERATIONS = (OperationType.SELL, OperationType.SHORTSELL)
+
+
+def transactions_to_arrays(item_dict):
+    """
+    Convertit l'inventaire des transactions en tableaux numpy alignés.
+
+    Args:
+        item_dict (dict): Dictionnaire {id: StockEntry} des transactions.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: dates (datetime64[D]), isins,
+        quantités signées (négatives pour les ventes) et prix unitaires.
+    """
+    entries = list(item_dict.values())
+    dates = np.array([entry.date for entry in entries], dtype="datetime64[D]")
+    isins = np.array([entry.isin for entry in entries], dtype=object)
+    signs = np.array([-1.0 if entry.operation_type in SELL_OPERATIONS else 1.0 for entry in entries])
+    quantities = np.array([entry.quantity for entry in entries], dtype=float) * signs
+    unit_prices = np.array([entry.unit_price for entry in entries], dtype=float)
+    return dates, isins, quantities, unit_prices
+
+
+def apply_transaction(position, quantity, unit_price):
+    """
+    Applique une transaction à l'état d'une position, selon la méthode du coût moyen pondéré.
+    Une transaction qui réduit la position réalise la plus ou moins-value de la partie clôturée ;
+    si elle retourne la position (vente au-delà de la quantité détenue), le reliquat ouvre une position
+    de sens opposé au prix de la transaction.
+
+    Args:
+        position (tuple): État (quantité, coût de revient, plus ou moins-value réalisée) avant la transaction.
+        quantity (float): Quantité signée de la transaction (négative pour les ventes).
+        unit_price (float): Prix unitaire de la transaction.
+
+    Returns:
+        tuple: Le nouvel état (quantité, coût de revient, plus ou moins-value réalisée).
+    """
+    held, cost_basis, realized_pnl = position
+    if held == 0 or (held > 0) == (quantity > 0):
+        # ouverture ou renforcement de la position
+        return held + quantity, cost_basis + quantity * unit_price, realized_pnl
+
+    # réduction de la position : la partie clôturée sort au coût moyen
+    closed = quantity if abs(quantity) <= abs(held) else -held
+    average_cost = cost_basis / held
+    realized_pnl -= closed * (unit_price - average_cost)
+    held += closed
+    cost_basis = cost_basis + closed * average_cost if held else 0.0
+
+    # retournement : le reliquat ouvre une position de sens opposé
+    remainder = quantity - closed
+    return held + remainder, cost_basis + remainder * unit_price, realized_pnl
+
+
+def compute_valuation(dates, isins, quantities, unit_prices, prices):
+    """
+    Calcule la valeur du portefeuille, son coût de revient, le montant net investi et la plus ou moins-value
+    pour chaque jour de cotation.
+
+    Le calcul est matriciel : les quantités signées sont ventilées dans une matrice (jours x tickers),
+    cumulées sur l'axe des dates, puis multipliées terme à terme par la matrice des prix alignée.
+    Les transactions antérieures au premier jour sont reportées sur celui-ci, celles tombant un jour
+    non coté sur le jour de cotation suivant, et celles postérieures au dernier jour sont ignorées.
+
+    Args:
+        dates (np.ndarray): Dates des transactions (datetime64[D]).
+        isins (np.ndarray): ISIN des transactions.
+        quantities (np.ndarray): Quantités signées des transactions.
+        unit_prices (np.ndarray): Prix unitaires des transactions.
+        prices (pd.DataFrame): Prix ajustés indexés par jour de cotation, une colonne par ISIN.
+
+    Returns:
+        dict: Séries « dates », « value », « cost_basis », « net_invested » et « pnl » (une valeur par jour de cotation).
+    """
+    calendar = prices.index.values.astype("datetime64[D]")
+    n_days, n_tickers = len(calendar), len(prices.columns)
+
+    # Ligne (jour) et colonne (ticker) de chaque transaction dans la matrice
+    rows = np.searchsorted(calendar, dates, side="left")
+    column_of = {isin: col for col, isin in enumerate(prices.columns)}
+    cols = np.array([column_of.get(isin, -1) for isin in isins], dtype=np.int64)
+    in_range = (rows < n_days) & (cols >= 0)
+    rows, cols = rows[in_range], cols[in_range]
+
+    # Quantités détenues : somme cumulée des quantités signées par ISIN (jours x tickers)
+    flows = np.zeros((n_days, n_tickers))
+    np.add.at(flows, (rows, cols), quantities[in_range])
+    holdings = np.cumsum(flows, axis=0)
+
+    # Prix alignés, propagés sur les jours sans cotation (0 avant la première cotation)
+    price_matrix = np.nan_to_num(prices.ffill().to_numpy(dtype=float))
+    value = (holdings * price_matrix).sum(axis=1)
+
+    # Montant net investi : montants des achats nets des produits des ventes, cumulés. Ce n'est pas un coût de revient
+    # (les ventes retranchent leur produit, pas le coût des titres cédés) : la plus ou moins-value est donc totale,
+    # réalisée et latente
+    cash_flows = np.zeros(n_days)
+    np.add.at(cash_flows, rows, (quantities * unit_prices)[in_range])
+    net_invested = np.cumsum(cash_flows)
+
+    # Coût de revient des positions détenues, au coût moyen pondéré (mêmes règles que /portfolio/positions) :
+    # les transactions sont rejouées par date, le total après la dernière transaction d'un jour est reporté sur ce jour
+    # puis propagé aux jours suivants
+    cost_basis = np.full(n_days, np.nan)
+    state, total = {}, 0.0
+    isins, quantities, unit_prices = isins[in_range], quantities[in_range], unit_prices[in_range]
+    for position in np.argsort(dates[in_range], kind="stable"):
+        isin = isins[position]
+        previous = state.get(isin, (0.0, 0.0, 0.0))
+        state[isin] = apply_transaction(previous, quantities[position], unit_prices[position])
+        total += state[isin][1] - previous[1]
+        cost_basis[rows[position]] = total
+    cost_basis = np.nan_to_num(pd.Series(cost_basis).ffill().to_numpy())
+
+    return {
+        "dates": np.datetime_as_string(calendar, unit="D").tolist(),
+        "value": value,
+        "cost_basis": cost_basis,
+        "net_invested": net_invested,
+        "pnl": value - net_invested,
+    }
+
+
+def get_portfolio_valuation(item_dict, start_date=None, end_date=None, portfolio=DEFAULT_PORTFOLIO):
+    """
+    Retourne la série historique de valorisation du portefeuille. Seul le dernier calcul de chaque portefeuille
+    est conservé en cache, réutilisé tant que sa partition et la période demandée n'ont pas changé.
+
+    Args:
+        item_dict (dict): Dictionnaire {id: StockEntry} des transactions.
+        start_date (str, optional): Date de début (yyyy-mm-dd). Par défaut, la date de la première transaction.
+        end_date (str, optional): Date de fin (yyyy-mm-dd), incluse. Par défaut, aujourd'hui.
+        portfolio (str): Le nom du portefeuille.
+
+    Returns:
+        dict: Séries « dates », « value », « cost_basis », « net_invested » et « pnl ».
+    """
+    if not item_dict:
+        return {"dates": [], "value": [], "cost_basis": [], "net_invested": [], "pnl": []}
+
+    dates, isins, quantities, unit_prices = transactions_to_arrays(item_dict)
+    start_date = start_date or str(dates.min())
+    end_date = end_date or datetime.now().strftime("%Y-%m-%d")
+
+    # Le résultat n'est recalculé que si l'inventaire ou la période a changé depuis le dernier calcul :
+    # une seule entrée par portefeuille, remplacée à chaque nouveau calcul
+    key = ("valuation", portfolio)
+    version = get_store_version(portfolio)
+    cached = cache.get_cache(key)
+    if cached is not None and cached[:3] == (version, start_date, end_date):
+        return cached[3]
+
+    tickers = sorted(set(isins))
+    # yfinance exclut la date de fin : le lendemain est demandé pour inclure end_date
+    download_end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    prices = YahooFinanceDataLoader.compute_total_returns(tickers, start_date, download_end)
+    valuation = compute_valuation(dates, isins, quantities, unit_prices, prices)
+    cache.set_cache(key, (version, start_date, end_date, valuation))
+    return valuation